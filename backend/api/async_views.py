@@ -0,0 +1,138 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseNotModified
+from django.urls import URLPattern
+from django.utils.cache import patch_vary_headers
+
+from api.mixins import VersionedListMixin, get_list_cache_keys, is_not_modified
+from recipes.versions import VERSION_KEY
+
+ASYNC_ROUTES = (
+    'recipes-list',
+    'recipes-detail',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_THREAD_POOL_SIZE,
+    thread_name_prefix='foodgram-orm',
+)
+
+
+def call_in_pool(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Выполняет блокирующий код в ограниченном пуле потоков.
+
+    Контекст вызова копируется в поток, чтобы запросы к базе попали в
+    статистику своего запроса (RequestTimingMiddleware).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(
+        context.run, call_in_pool, func, *args, **kwargs))
+
+
+async def cache_get(key):
+    """Чтение из кэша: нативно асинхронное, если бэкенд это умеет.
+
+    Локальный кэш процесса читается сразу, остальные — через пул.
+    """
+    aget = getattr(cache, 'aget', None)
+    if aget is not None:
+        return await aget(key)
+    if isinstance(cache, LocMemCache):
+        return cache.get(key)
+    return await run_blocking(cache.get, key)
+
+
+def render_view(view, request, *args, **kwargs):
+    """Вызывает вьюсет и рендерит ответ в том же потоке пула.
+
+    Готовый ответ отдается как HttpResponse, чтобы Django не рендерил его
+    повторно через общий синхронный поток.
+    """
+    response = view(request, *args, **kwargs)
+    if not hasattr(response, 'render') or response.streaming:
+        return response
+    response.render()
+    rendered = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        rendered[header] = value
+    return rendered
+
+
+def accepts_cached_json(request):
+    accept = request.META.get('HTTP_ACCEPT', '*/*')
+    return (
+        'HTTP_AUTHORIZATION' not in request.META
+        and 'format' not in request.GET
+        and 'text/html' not in accept
+        and ('application/json' in accept or '*/*' in accept)
+    )
+
+
+async def get_cached_list(request, version_name):
+    """Готовый ответ справочного списка из кэша без захода в пул ORM"""
+    version = await cache_get(VERSION_KEY.format(version_name))
+    if version is None:
+        return None
+    etag, key = get_list_cache_keys(version_name, version, request.GET)
+    if is_not_modified(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        content = await cache_get(key)
+        if content is None:
+            return None
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept', ))
+    return response
+
+
+def as_async_view(view, version_name=None):
+    """Асинхронная обертка над вьюсетом DRF для ASGI-режима"""
+    async def async_view(request, *args, **kwargs):
+        if (version_name and request.method == 'GET'
+                and accepts_cached_json(request)):
+            response = await get_cached_list(request, version_name)
+            if response is not None:
+                return response
+        return await run_blocking(render_view, view, request, *args, **kwargs)
+
+    async_view.csrf_exempt = True
+    async_view.cls = view.cls
+    async_view.actions = view.actions
+    return async_view
+
+
+def get_async_urls(urls):
+    """Заменяет вьюсеты чтения на асинхронные обертки, остальное не трогает"""
+    async_urls = []
+    for url in urls:
+        if isinstance(url, URLPattern) and url.name in ASYNC_ROUTES:
+            version_name = None
+            if (url.name.endswith('-list')
+                    and issubclass(url.callback.cls, VersionedListMixin)):
+                version_name = url.callback.cls.version_name
+            url = URLPattern(
+                url.pattern, as_async_view(url.callback, version_name),
+                url.default_args, url.name)
+        async_urls.append(url)
+    return async_urls
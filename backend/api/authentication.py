@@ -0,0 +1,46 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_KEY = 'auth-token:{}'
+
+
+def get_token_cache_key(key):
+    """Ключ кэша без самого токена, чтобы он не попадал в кэш открыто"""
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def invalidate_tokens(keys):
+    """Сбрасывает закэшированные токены после коммита транзакции"""
+    cache_keys = [get_token_cache_key(key) for key in keys]
+    if cache_keys:
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+def invalidate_user_tokens(user_id):
+    invalidate_tokens(Token.objects.filter(
+        user_id=user_id).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который кэширует пользователя токена.
+
+    Попадание в кэш не обращается к базе вовсе. Запись живет
+    TOKEN_CACHE_TIMEOUT секунд и сбрасывается после коммита при удалении
+    токена и сохранении пользователя (смена пароля, отключение), см.
+    api.signals. Изменения в обход сигналов, например queryset.update(),
+    видны не позже чем через TOKEN_CACHE_TIMEOUT.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        user = cache.get(cache_key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, user, settings.TOKEN_CACHE_TIMEOUT)
+            return user, token
+        return user, Token(key=key, user=user)
@@ -1,6 +1,10 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import filters, FilterSet
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Ingredient, Tag, Recipe
+from recipes.models import Favorite, Ingredient, ShoppingCart, Tag, Recipe
+from recipes.search import search_recipes
+from recipes.tag_masks import filter_by_tags
 
 
 class IngredientFilter(FilterSet):
@@ -16,6 +20,7 @@ class RecipeFilter(FilterSet):
         queryset=Tag.objects.all(),
         field_name='tags__slug',
         to_field_name='slug',
+        method='get_tags',
     )
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited'
@@ -23,17 +28,42 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    search = filters.CharFilter(
+        method='get_search'
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
 
-    def get_is_favorited(self, queryset, name, value):
+    def get_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return filter_by_tags(queryset, [tag.pk for tag in value])
+
+    def filter_user_relation(self, queryset, model, value):
+        """Рецепты, для которых у пользователя есть строка model"""
         if self.request.user.is_authenticated and value:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(Exists(model.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk'))))
         return queryset
 
+    def get_is_favorited(self, queryset, name, value):
+        return self.filter_user_relation(queryset, Favorite, value)
+
     def get_is_in_shopping_cart(self, queryset, name, value):
-        if self.request.user.is_authenticated and value:
-            return queryset.filter(shopping_cart__user=self.request.user)
-        return queryset
+        return self.filter_user_relation(queryset, ShoppingCart, value)
+
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """Сортировка рецептов, при поиске по умолчанию по релевантности"""
+
+    def get_ordering(self, request, queryset, view):
+        if (self.ordering_param not in request.query_params
+                and 'search_rank' in queryset.query.annotations):
+            return ['-search_rank', '-pk']
+        return super().get_ordering(request, queryset, view)
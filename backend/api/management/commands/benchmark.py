@@ -0,0 +1,198 @@
+import json
+import random
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, ShoppingCart
+from recipes.management.commands.seed_benchmark import EMAIL_DOMAIN
+
+ENDPOINTS = (
+    'recipes_list',
+    'recipes_detail',
+    'subscriptions',
+    'feed',
+    'ingredients',
+    'download_shopping_cart',
+)
+
+
+def percentile(values, share):
+    """Значение по рангу из отсортированного списка"""
+    if not values:
+        return None
+    rank = max(int(round(share * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Dataset:
+    """Ключи из базы, по которым строятся запросы к эндпоинтам"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.recipes = list(Recipe.objects.values_list('pk', flat=True))
+        tokens = Token.objects.filter(
+            user__email__endswith=f'@{EMAIL_DOMAIN}')
+        self.tokens = list(tokens.values_list('key', flat=True))
+        self.cart_tokens = list(tokens.filter(
+            user__in=ShoppingCart.objects.values('user')
+        ).values_list('key', flat=True)) or self.tokens
+        self.prefixes = sorted({
+            name[:3] for name in Ingredient.objects.values_list(
+                'name', flat=True)
+        })
+        if not self.recipes or not self.tokens:
+            raise CommandError(
+                'Нет данных для замеров, запустите seed_benchmark')
+
+    def build(self, endpoint):
+        """Запрос к эндпоинту: (путь, токен или None)"""
+        rng = self.rng
+        if endpoint == 'recipes_list':
+            return (f'/api/recipes/?page={rng.randint(1, 20)}&limit=6',
+                    rng.choice((None, rng.choice(self.tokens))))
+        if endpoint == 'recipes_detail':
+            return (f'/api/recipes/{rng.choice(self.recipes)}/',
+                    rng.choice((None, rng.choice(self.tokens))))
+        if endpoint == 'subscriptions':
+            return ('/api/users/subscriptions/?limit=6&recipes_limit=3',
+                    rng.choice(self.tokens))
+        if endpoint == 'feed':
+            return '/api/recipes/feed/?limit=6', rng.choice(self.tokens)
+        if endpoint == 'ingredients':
+            return (f'/api/ingredients/?name='
+                    f'{quote(rng.choice(self.prefixes))}', None)
+        return ('/api/recipes/download_shopping_cart/?format=txt',
+                rng.choice(self.cart_tokens))
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный замер эндпоинтов: p50/p95/p99 и пропускная '
+            'способность в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера, например http://127.0.0.1:8000; '
+                 'без него запросы выполняются в процессе')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Запросов на эндпоинт')
+        parser.add_argument('--warmup', type=int, default=50,
+                            help='Запросов на прогрев, не входят в замер')
+        parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS,
+                            default=list(ENDPOINTS))
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Файл для JSON-отчета')
+
+    def send_local(self, path, token):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+        headers = {}
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+        response = client.get(path, **headers)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+    def send_http(self, path, token):
+        request = Request(self.url + path)
+        if token:
+            request.add_header('Authorization', f'Token {token}')
+        try:
+            with urlopen(request) as response:
+                while response.read(64 * 1024):
+                    pass
+                return response.status
+        except HTTPError as error:
+            return error.code
+
+    def timed(self, path, token):
+        started = perf_counter()
+        try:
+            status = self.send(path, token)
+        except Exception:
+            status = None
+        return status, perf_counter() - started
+
+    def run(self, executor, requests):
+        started = perf_counter()
+        results = list(executor.map(lambda args: self.timed(*args), requests))
+        return results, perf_counter() - started
+
+    def measure(self, executor, dataset, endpoint, options):
+        warmup = [dataset.build(endpoint) for _ in range(options['warmup'])]
+        self.run(executor, warmup)
+        requests = [
+            dataset.build(endpoint) for _ in range(options['requests'])]
+        results, duration = self.run(executor, requests)
+        latencies = sorted(
+            latency for status, latency in results
+            if status is not None and status < 400)
+        errors = len(results) - len(latencies)
+        return {
+            'requests': len(results),
+            'errors': errors,
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(len(latencies) / duration, 1),
+            **{
+                f'{name}_ms': (
+                    round(percentile(latencies, share) * 1000, 2)
+                    if latencies else None)
+                for name, share in (
+                    ('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+            },
+        }
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError(
+                '--concurrency и --requests должны быть больше ноля')
+        self.url = (options['url'] or '').rstrip('/')
+        self.send = self.send_http if self.url else self.send_local
+        self.local = threading.local()
+        dataset = Dataset(random.Random(options['seed']))
+
+        report = {
+            'commit': get_commit(),
+            'target': self.url or 'in-process',
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'seed': options['seed'],
+            'endpoints': {},
+        }
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            for endpoint in options['endpoints']:
+                report['endpoints'][endpoint] = self.measure(
+                    executor, dataset, endpoint, options)
+                self.stderr.write(
+                    f'{endpoint}: {report["endpoints"][endpoint]}')
+
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        self.stdout.write(output)
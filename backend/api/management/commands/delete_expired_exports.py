@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from api.tasks import delete_expired_exports
+
+
+class Command(BaseCommand):
+    help = 'Удаление устаревших выгрузок списков покупок'
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_exports()
+        self.stdout.write(f'Удалено выгрузок: {deleted}')
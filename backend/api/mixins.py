@@ -0,0 +1,54 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.versions import get_version
+
+
+def get_list_cache_keys(version_name, version, query_params):
+    """ETag и ключ кэша готового ответа справочного списка"""
+    query = hashlib.md5(query_params.urlencode().encode()).hexdigest()
+    etag = f'"{version}-{query}"'
+    key = f'response:{version_name}:{version}:{query}'
+    return etag, key
+
+
+def is_not_modified(request, etag):
+    return etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+
+class VersionedListMixin:
+    """Условный GET и кэш готового ответа для справочных списков"""
+    version_name = None
+
+    def get_list_data(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs).data
+
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return Response(self.get_list_data(request, *args, **kwargs))
+
+        etag, key = get_list_cache_keys(
+            self.version_name, get_version(self.version_name),
+            request.query_params)
+        if is_not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = etag
+            return response
+
+        content = cache.get(key)
+        if content is None:
+            data = self.get_list_data(request, *args, **kwargs)
+            content = request.accepted_renderer.render(
+                data, request.accepted_media_type, self.get_renderer_context())
+            cache.set(key, content, settings.REFERENCE_CACHE_TIMEOUT)
+
+        response = HttpResponse(
+            content, content_type=request.accepted_media_type)
+        response['ETag'] = etag
+        return response
@@ -1,5 +1,51 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class LimitCursorPagination(CursorPagination):
+    """Постраничный вывод по курсору без COUNT и OFFSET"""
+    page_size_query_param = 'limit'
+    count_query_param = 'count'
+    ordering = '-pk'
+
+    def get_ordering(self, request, queryset, view):
+        if any(hasattr(backend, 'get_ordering')
+               for backend in getattr(view, 'filter_backends', [])):
+            return super().get_ordering(request, queryset, view)
+        return tuple(queryset.model._meta.ordering) or (self.ordering, )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict()
+        if self.count is not None:
+            response_data['count'] = self.count
+        response_data['next'] = self.get_next_link()
+        response_data['previous'] = self.get_previous_link()
+        response_data['results'] = data
+        return Response(response_data)
 
 
 class LimitPagination(PageNumberPagination):
+    """Постраничный вывод по номеру страницы или, с ?cursor=, по курсору"""
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = LimitCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from recipes.memberships import get_memberships
+from recipes.models import Recipe, RecipeIngredient
+from recipes.versions import get_recipe_cache_keys
+from .serializers import ReadRecipeSerializer
+
+ROW_FIELDS = (
+    'pk',
+    'favorites_count',
+    'carts_count',
+    'author_id',
+    'author__recipes_count',
+    'author__followers_count',
+)
+
+
+def get_recipe_rows(queryset):
+    """Ключи рецептов и счетчики без самих рецептов"""
+    fields = ROW_FIELDS
+    if 'search_rank' in queryset.query.annotations:
+        fields += ('search_rank', )
+    return queryset.values(*fields)
+
+
+def get_public_representations(pks):
+    """Общие для всех пользователей представления рецептов из кэша.
+
+    Недостающие в кэше рецепты сериализуются одной пачкой и кэшируются.
+    """
+    keys = get_recipe_cache_keys(pks)
+    cached = cache.get_many(keys.values())
+    representations = {
+        pk: cached[key] for pk, key in keys.items() if key in cached
+    }
+    missing = [pk for pk in pks if pk not in representations]
+    if missing:
+        recipes = Recipe.objects.filter(
+            pk__in=missing
+        ).select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+        fresh = {
+            representation['id']: representation
+            for representation in ReadRecipeSerializer(
+                recipes, many=True).data
+        }
+        cache.set_many(
+            {keys[pk]: representation for pk, representation in fresh.items()},
+            settings.RECIPE_CACHE_TIMEOUT,
+        )
+        representations.update(fresh)
+    return representations
+
+
+def absolute_url(request, url):
+    return request.build_absolute_uri(url) if url else url
+
+
+def overlay(representation, row, request):
+    """Дополняет общее представление счетчиками и флагами пользователя"""
+    memberships = get_memberships(request)
+    representation = dict(representation)
+    representation['author'] = dict(
+        representation['author'],
+        is_subscribed=row['author_id'] in memberships.follows,
+        recipes_count=row['author__recipes_count'],
+        followers_count=row['author__followers_count'],
+    )
+    representation['is_favorited'] = row['pk'] in memberships.favorites
+    representation['is_in_shopping_cart'] = row['pk'] in memberships.cart
+    representation['favorites_count'] = row['favorites_count']
+    representation['carts_count'] = row['carts_count']
+    representation['image'] = absolute_url(request, representation['image'])
+    if representation['image_variants']:
+        representation['image_variants'] = {
+            size: {
+                extension: absolute_url(request, url)
+                for extension, url in formats.items()
+            }
+            for size, formats in representation['image_variants'].items()
+        }
+    return representation
+
+
+def get_recipes_representation(rows, request):
+    representations = get_public_representations([row['pk'] for row in rows])
+    return [
+        overlay(representations[row['pk']], row, request)
+        for row in rows if row['pk'] in representations
+    ]
@@ -5,13 +5,24 @@ import uuid
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.urls import reverse
 from rest_framework import serializers
 
+from jobs.models import Job
 from users.models import FoodgramUser
+from recipes.cart_totals import update_recipe_in_cart_totals
+from recipes.counters import change_counter
+from recipes.images import get_derivative_urls
+from recipes.locks import lock_recipes
+from recipes.memberships import get_memberships
 from recipes.models import (
-    ShoppingCart, Tag, Recipe,
-    Ingredient, RecipeIngredient, Follow, Favorite
+    Tag, Recipe,
+    Ingredient, RecipeIngredient, ShoppingCartTotal
     )
+from recipes.search import update_search_index
+from recipes.versions import invalidate_recipes
 
 User = get_user_model()
 
@@ -29,26 +40,18 @@ class UsersSerializer(serializers.ModelSerializer):
             'first_name',
             'last_name',
             'is_subscribed',
+            'recipes_count',
+            'followers_count',
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return Follow.objects.filter(
-                user=request.user, author=obj).exists()
+            return obj.pk in get_memberships(request).follows
         return False
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            is_subscribed = Follow.objects.filter(
-                user=request.user, author=instance).exists()
-        else:
-            is_subscribed = False
-        representation['is_subscribed'] = is_subscribed
-        return representation
-
 
 class PasswordSerializer(serializers.ModelSerializer):
     """Сериализатор для пароля"""
@@ -72,6 +75,26 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug')
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения рецепта"""
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        urls = get_derivative_urls(value.image, value.image_variants_name)
+        request = self.context.get('request')
+        if urls is None or request is None:
+            return urls
+        return {
+            size: {
+                extension: request.build_absolute_uri(url)
+                for extension, url in formats.items()
+            }
+            for size, formats in urls.items()
+        }
+
+
 class Base64ImageField(serializers.ImageField):
     """Сериализатор для работы с изображениями"""
     def to_internal_value(self, data):
@@ -104,15 +127,59 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', )
 
 
+def resolve_ids(queryset, ids, message):
+    """Находит объекты по списку id одним запросом in_bulk.
+
+    Если каких-то id нет, в ошибке перечисляются все отсутствующие.
+    """
+    objects = queryset.in_bulk(set(ids))
+    missing = sorted(set(ids) - objects.keys())
+    if missing:
+        raise serializers.ValidationError(
+            f'{message}: {", ".join(map(str, missing))}')
+    return [objects[pk] for pk in ids]
+
+
+class BulkPrimaryKeyListField(serializers.ListField):
+    """Список id, которые проверяются одним запросом"""
+    child = serializers.IntegerField()
+
+    def __init__(self, queryset, message, **kwargs):
+        self.queryset = queryset
+        self.message = message
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        ids = super().to_internal_value(data)
+        return resolve_ids(self.queryset.all(), ids, self.message)
+
+    def to_representation(self, value):
+        return [obj.pk for obj in value.all()]
+
+
+class AmountIngredientsListSerializer(serializers.ListSerializer):
+    """Список пар ингредиент-кол-во с проверкой id одним запросом"""
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = resolve_ids(
+            Ingredient.objects.all(),
+            [item['id'] for item in items],
+            'Несуществующие ингредиенты',
+        )
+        for item, ingredient in zip(items, ingredients):
+            item['id'] = ingredient
+        return items
+
+
 class AmountIngredientsSerializer(serializers.ModelSerializer):
     """Сериализатор для работы с парой ингредиент-кол-во"""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount', )
+        list_serializer_class = AmountIngredientsListSerializer
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
@@ -149,26 +216,26 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField(required=False)
+    image_variants = ImageVariantsField()
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return Favorite.objects.filter(
-                user=request.user, recipe=obj).exists()
+            return obj.pk in get_memberships(request).favorites
         return False
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return ShoppingCart.objects.filter(
-                user=request.user, recipe=obj).exists()
+            return obj.pk in get_memberships(request).cart
         return False
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags',  'author',
                   'ingredients', 'is_favorited', 'is_in_shopping_cart', 'name',
-                  'image', 'text', 'cooking_time'
+                  'image', 'image_variants', 'text', 'cooking_time',
+                  'favorites_count', 'carts_count'
                   )
 
 
@@ -176,8 +243,8 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для создания/изменения рецептов"""
     image = Base64ImageField(max_length=None)
     ingredients = AmountIngredientsSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True)
+    tags = BulkPrimaryKeyListField(
+        queryset=Tag.objects.all(), message='Несуществующие теги')
 
     class Meta:
         model = Recipe
@@ -188,28 +255,29 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, data):
-        ingredients = data['ingredients']
-        ingredients_list = []
+        # В PATCH поля необязательны: проверяются только переданные
+        ingredients = data.get('ingredients')
+        ingredients_set = set()
 
-        if len(ingredients) < 1:
+        if ingredients is not None and len(ingredients) < 1:
             raise serializers.ValidationError(
                 'Должен быть хотя бы 1 ингредиент!')
-        if len(data['tags']) < 1:
+        if 'tags' in data and len(data['tags']) < 1:
             raise serializers.ValidationError(
                 'Должен быть хотя бы 1 тег!')
-        if data['cooking_time'] < 1:
+        if 'cooking_time' in data and data['cooking_time'] < 1:
             raise serializers.ValidationError(
                 'Время приготовления должно быть больше 1 мин.!')
 
-        for ingredient in ingredients:
-            if ingredient['id'] in ingredients_list:
+        for ingredient in ingredients or ():
+            if ingredient['id'].pk in ingredients_set:
                 raise serializers.ValidationError(
                     'Ингредиент должен быть уникальным!')
             if ingredient['amount'] < 1:
                 raise serializers.ValidationError(
                     'Количество ингредиента должно быть больше ноля!')
 
-            ingredients_list.append(ingredient['id'])
+            ingredients_set.add(ingredient['id'].pk)
 
         return data
 
@@ -227,43 +295,101 @@ class CreateUpdateRecipeSerializer(serializers.ModelSerializer):
         RecipeIngredient.objects.bulk_create(list_obj)
 
     def to_representation(self, instance):
-        return ReadRecipeSerializer(instance).data
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'recipe_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+        return ReadRecipeSerializer(instance, context=self.context).data
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request')
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(author=request.user, **validated_data)
+        change_counter(FoodgramUser, request.user.pk, 'recipes_count', 1)
 
         recipe.tags.set(tags)
         self.load_data(ingredients, recipe)
 
         return recipe
 
+    def sync_data(self, ingredients, instance):
+        """Приводит ингредиенты рецепта к ingredients, меняя только разницу"""
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=instance)
+        }
+        old_amounts = {
+            ingredient_id: recipe_ingredient.amount
+            for ingredient_id, recipe_ingredient in existing.items()
+        }
+        new_amounts = {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_create, to_update = [], []
+        for ingredient in ingredients:
+            recipe_ingredient = existing.get(ingredient['id'].pk)
+            if recipe_ingredient is None:
+                to_create.append(RecipeIngredient(
+                    ingredient=ingredient['id'],
+                    amount=ingredient['amount'],
+                    recipe=instance,
+                ))
+            elif recipe_ingredient.amount != ingredient['amount']:
+                recipe_ingredient.amount = ingredient['amount']
+                to_update.append(recipe_ingredient)
+
+        to_delete = old_amounts.keys() - new_amounts.keys()
+        if to_delete:
+            RecipeIngredient.objects.filter(
+                recipe=instance, ingredient_id__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+
+        update_recipe_in_cart_totals(instance, old_amounts, new_amounts)
+        if to_create or to_update:
+            invalidate_recipes([instance.pk])
+            update_search_index([instance.pk])
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-
+        lock_recipes([instance.pk])
+        ingredients = validated_data.pop('ingredients', None)
         if ingredients is not None:
-            instance.ingredients.clear()
+            self.sync_data(ingredients, instance)
 
-        self.load_data(ingredients, instance)
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
 
-        return super().update(instance, validated_data)
+        return instance
 
 
 class SmallReadRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для чтения краткой информации о рецепте"""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time', )
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time', )
 
 
 class FollowSerializer(serializers.ModelSerializer):
     """Сериализатор для работы с подписками"""
     is_subscribed = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
-    recipes = SmallReadRecipeSerializer(source='author', many=True)
+    recipes = serializers.SerializerMethodField()
 
     class Meta:
         model = FoodgramUser
@@ -276,14 +402,78 @@ class FollowSerializer(serializers.ModelSerializer):
             'is_subscribed',
             'recipes',
             'recipes_count',
+            'followers_count',
         )
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+    def get_recipes(self, obj):
+        recipes_preview = self.context.get('recipes_preview')
+        if recipes_preview is not None:
+            recipes = recipes_preview.get(obj.pk, [])
+        else:
+            recipes = obj.author.all()[:self.context.get(
+                'recipes_limit', settings.RECIPES_LIMIT_DEFAULT)]
+        return SmallReadRecipeSerializer(
+            recipes, many=True, context=self.context).data
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return Follow.objects.filter(
-                user=request.user, author=obj).exists()
+            return obj.pk in get_memberships(request).follows
         return False
+
+
+class ShoppingCartTotalSerializer(serializers.ModelSerializer):
+    """Сериализатор для итогов корзины покупок"""
+    id = serializers.IntegerField(source='ingredient.id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit')
+
+    class Meta:
+        model = ShoppingCartTotal
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
+class BatchIdsSerializer(serializers.Serializer):
+    """Список id для пакетных операций"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_IDS,
+    )
+
+
+class ServingsSerializer(serializers.Serializer):
+    """Число порций рецепта в корзине"""
+    servings = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.MAX_SERVINGS,
+        required=False,
+    )
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Сериализатор для статуса фоновой задачи.
+
+    Файл из результата задачи отдается ссылкой на закрытую загрузку.
+    """
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'status', 'attempts',
+            'result', 'error', 'created', 'updated',
+        )
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        result = representation['result']
+        if isinstance(result, dict) and 'file' in result:
+            url = reverse('api:jobs-download', kwargs={'pk': instance.pk})
+            request = self.context.get('request')
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            representation['result'] = {'url': url}
+        return representation
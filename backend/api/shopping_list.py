@@ -0,0 +1,158 @@
+import csv
+import json
+import threading
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+from recipes.models import ShoppingCartTotal
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 20
+
+_pdf_font_lock = threading.Lock()
+_pdf_font = None
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок, сам список отдается потоком"""
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class TxtShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CsvShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PdfShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+class Echo:
+    """Псевдо-файл, отдающий записанную строку вместо буферизации"""
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_list(user):
+    """Итератор по суммарным количествам ингредиентов в корзине.
+
+    Количества переводятся в базовую единицу и суммируются тем же
+    запросом, поэтому «мука, кг» и «мука, г» дают одну строку.
+    """
+    return ShoppingCartTotal.objects.filter(
+        user=user
+    ).values(
+        name=F('ingredient__name'),
+        unit=Coalesce('ingredient__unit_conversion__canonical_unit',
+                      'ingredient__measurement_unit'),
+    ).annotate(
+        total=Sum(F('amount') * Coalesce(
+            'ingredient__unit_conversion__factor', 1))
+    ).order_by(
+        'name', 'unit'
+    ).values_list(
+        'name', 'unit', 'total'
+    ).iterator(chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE)
+
+
+def stream_txt(rows):
+    yield f'{SHOPPING_LIST_TITLE}\n'
+    for name, unit, amount in rows:
+        yield f'\n{name} - {amount}, {unit}'
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Ед. изм.'))
+    for name, unit, amount in rows:
+        yield writer.writerow((name, amount, unit))
+
+
+def spool(chunks):
+    """Записывает поток во временный файл и возвращает его с начала"""
+    buffer = SpooledTemporaryFile(max_size=settings.SHOPPING_LIST_SPOOL_SIZE)
+    for chunk in chunks:
+        buffer.write(chunk.encode() if isinstance(chunk, str) else chunk)
+    buffer.seek(0)
+    return buffer
+
+
+def get_pdf_font():
+    """Регистрирует шрифт с кириллицей один раз на процесс.
+
+    Встроенные шрифты PDF не содержат кириллицы, поэтому без файла
+    шрифта список не формируется вовсе.
+    """
+    global _pdf_font
+    if _pdf_font is None:
+        with _pdf_font_lock:
+            if _pdf_font is None:
+                try:
+                    pdfmetrics.registerFont(
+                        TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_FONT))
+                except (OSError, TTFError) as error:
+                    raise ImproperlyConfigured(
+                        'Не удалось загрузить шрифт для PDF '
+                        f'{settings.SHOPPING_LIST_FONT}: {error}'
+                    ) from error
+                _pdf_font = PDF_FONT_NAME
+    return _pdf_font
+
+
+def stream_pdf(rows):
+    # Шрифт загружается до начала ответа, а не внутри потока
+    return render_pdf(rows, get_pdf_font())
+
+
+def render_pdf(rows, font):
+    width, height = A4
+    with SpooledTemporaryFile(
+            max_size=settings.SHOPPING_LIST_SPOOL_SIZE) as buffer:
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        y = height - PDF_MARGIN
+        pdf.setFont(font, 16)
+        pdf.drawString(PDF_MARGIN, y, SHOPPING_LIST_TITLE)
+        y -= PDF_LINE_HEIGHT * 1.5
+        pdf.setFont(font, 12)
+        for name, unit, amount in rows:
+            if y < PDF_MARGIN:
+                pdf.showPage()
+                pdf.setFont(font, 12)
+                y = height - PDF_MARGIN
+            pdf.drawString(PDF_MARGIN, y, f'{name} - {amount}, {unit}')
+            y -= PDF_LINE_HEIGHT
+        pdf.save()
+
+        buffer.seek(0)
+        yield from iter(lambda: buffer.read(64 * 1024), b'')
+
+
+SHOPPING_LIST_STREAMS = {
+    TxtShoppingListRenderer.format: stream_txt,
+    CsvShoppingListRenderer.format: stream_csv,
+    PdfShoppingListRenderer.format: stream_pdf,
+}
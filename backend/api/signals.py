@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from users.models import FoodgramUser
+from .authentication import invalidate_tokens, invalidate_user_tokens
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=FoodgramUser)
+def user_saved(sender, instance, created=False, update_fields=None,
+               **kwargs):
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    invalidate_user_tokens(instance.pk)
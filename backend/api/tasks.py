@@ -0,0 +1,51 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+
+from jobs.registry import job
+from .shopping_list import SHOPPING_LIST_STREAMS, get_shopping_list, spool
+
+EXPORTS_DIRECTORY = 'shopping_lists'
+
+
+def get_export_storage():
+    """Закрытое хранилище выгрузок: отдается только через API"""
+    return FileSystemStorage(location=settings.SHOPPING_LIST_EXPORTS_ROOT)
+
+
+def delete_expired_exports(user_ids=None):
+    """Удаляет выгрузки старше SHOPPING_LIST_EXPORT_TTL, возвращает их
+    число"""
+    storage = get_export_storage()
+    if user_ids is None:
+        if not storage.exists(EXPORTS_DIRECTORY):
+            return 0
+        user_ids, _ = storage.listdir(EXPORTS_DIRECTORY)
+    expired = timezone.now() - timedelta(
+        seconds=settings.SHOPPING_LIST_EXPORT_TTL)
+    deleted = 0
+    for user_id in user_ids:
+        directory = f'{EXPORTS_DIRECTORY}/{user_id}'
+        if not storage.exists(directory):
+            continue
+        for name in storage.listdir(directory)[1]:
+            name = f'{directory}/{name}'
+            if storage.get_modified_time(name) < expired:
+                storage.delete(name)
+                deleted += 1
+    return deleted
+
+
+@job('api.export_shopping_list')
+def export_shopping_list(user_id, format):
+    delete_expired_exports([user_id])
+    storage = get_export_storage()
+    name = f'{EXPORTS_DIRECTORY}/{user_id}/{uuid.uuid4().hex}.{format}'
+    with spool(SHOPPING_LIST_STREAMS[format](
+            get_shopping_list(user_id))) as buffer:
+        name = storage.save(name, File(buffer))
+    return {'file': name}
@@ -0,0 +1,8 @@
+from django.urls import include, path
+
+from api.async_views import get_async_urls
+from api.urls import router
+
+urlpatterns = [
+    path('api/', include((get_async_urls(router.urls), 'api'))),
+]
@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase, override_settings
+
+from api import async_views
+from foodgram.testing import create_user
+from recipes.models import Recipe, Tag
+
+
+@override_settings(
+    ROOT_URLCONF='api.tests.async_urls', REQUEST_TIMING_ENABLED=True)
+class AsyncReadViewTests(TransactionTestCase):
+    """Маршруты чтения в ASGI: кэш без пула и ORM в пуле потоков"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+        author = create_user('author')
+        self.tag = Tag.objects.create(
+            name='Завтрак', color='#000001', slug='breakfast')
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=1)
+
+    async def test_cached_list_without_pool(self):
+        response = await self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with mock.patch.object(
+                async_views, 'render_view', side_effect=AssertionError):
+            cached = await self.client.get('/api/tags/')
+            self.assertEqual(cached.status_code, 200)
+            self.assertEqual(cached.content, response.content)
+            # AsyncClient в Django 3.2 передает extra как заголовки ASGI
+            not_modified = await self.client.get(
+                '/api/tags/', **{'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+
+    async def test_pooled_views(self):
+        response = await self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [self.recipe.pk])
+        self.assertRegex(response['Server-Timing'], r'"[1-9]\d* queries"')
+        detail = await self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(detail.json()['name'], 'Рецепт')
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_user
+from recipes.counters import change_counter
+from users.models import FoodgramUser
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """Закэшированный токен не читает базу и сбрасывается сигналами"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self):
+        """Ответ /api/users/me/ и признак того, что токен или пользователь
+        читались из базы"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/users/me/')
+        loaded = any(
+            'authtoken_token' in query['sql']
+            or '"users_foodgramuser"."password"' in query['sql']
+            for query in context.captured_queries
+        )
+        return response, loaded
+
+    def test_hit_skips_database(self):
+        response, loaded = self.get_me()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(loaded)
+        response, loaded = self.get_me()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(loaded)
+
+    def test_counters_fresh(self):
+        self.get_me()
+        change_counter(FoodgramUser, self.reader.pk, 'recipes_count', 1)
+        response, loaded = self.get_me()
+        self.assertFalse(loaded)
+        self.assertEqual(response.data['recipes_count'], 1)
+
+    def test_password_change_and_logout(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/users/set_password/', {'new_password': 'pass12345YY'})
+        self.assertEqual(response.status_code, 204)
+        response, loaded = self.get_me()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(loaded)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        response, _ = self.get_me()
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivated_user(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.is_active = False
+            self.reader.save()
+        response, _ = self.get_me()
+        self.assertEqual(response.status_code, 401)
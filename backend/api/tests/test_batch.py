@@ -0,0 +1,97 @@
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_users
+from recipes.cart_totals import calculate_cart_totals
+from recipes.counters import reconcile_counters
+from recipes.models import (
+    Favorite, Ingredient, Recipe, RecipeIngredient, ShoppingCartTotal
+    )
+from users.models import FoodgramUser
+
+MISSING = 10 ** 9
+
+
+def get_state():
+    return (
+        list(Recipe.objects.order_by('pk').values_list(
+            'favorites_count', 'carts_count')),
+        list(FoodgramUser.objects.order_by('pk').values_list(
+            'followers_count', flat=True)),
+        sorted(ShoppingCartTotal.objects.values_list(
+            'user', 'ingredient', 'amount')),
+    )
+
+
+class BatchMembershipTests(APITestCase):
+    """Пакетные маршруты возвращают статус по каждому id и ведут счетчики
+    и итоги корзины так же, как одиночные"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, *cls.authors = create_users(3)
+        ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=1)
+            for number, author in enumerate(cls.authors * 2)
+        ]
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=number + 1)
+            for number, recipe in enumerate(cls.recipes)
+        ])
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        reconcile_counters()
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def test_results(self):
+        recipes = [recipe.pk for recipe in self.recipes[:2]]
+        url = '/api/recipes/favorite/'
+        response = self.client.post(
+            url, {'ids': recipes + [MISSING]}, format='json')
+        self.assertEqual(response.data['results'], [
+            {'id': recipes[0], 'status': 'exists'},
+            {'id': recipes[1], 'status': 'created'},
+            {'id': MISSING, 'status': 'not_found'},
+        ])
+        response = self.client.delete(
+            url, {'ids': recipes[1:] * 2}, format='json')
+        self.assertEqual(response.data['results'], [
+            {'id': recipes[1], 'status': 'deleted'},
+        ])
+        response = self.client.delete(
+            url, {'ids': recipes[1:]}, format='json')
+        self.assertEqual(response.data['results'], [
+            {'id': recipes[1], 'status': 'absent'},
+        ])
+        for data in ({'ids': []}, {'ids': ['x']}, {}):
+            with self.subTest(data=data):
+                response = self.client.post(url, data, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(None)
+        response = self.client.post(url, {'ids': recipes}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_counters_and_totals(self):
+        recipes = [recipe.pk for recipe in self.recipes]
+        authors = [author.pk for author in self.authors]
+        for method, url, ids in (
+                ('post', '/api/recipes/favorite/', recipes),
+                ('post', '/api/recipes/shopping_cart/', recipes),
+                ('post', '/api/users/subscribe/', authors),
+                ('delete', '/api/recipes/favorite/', recipes[::2]),
+                ('delete', '/api/recipes/shopping_cart/', recipes[1::2]),
+                ('delete', '/api/users/subscribe/', authors[:1])):
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(
+                    url, {'ids': ids + [MISSING]}, format='json')
+                self.assertEqual(response.status_code, 200)
+        state = get_state()
+        self.assertEqual(
+            state[2], sorted(calculate_cart_totals()))
+        reconcile_counters()
+        self.assertEqual(get_state(), state)
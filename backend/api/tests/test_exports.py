@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.tasks import delete_expired_exports, get_export_storage
+from foodgram.testing import create_users
+
+EXPORTS_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(SHOPPING_LIST_EXPORTS_ROOT=EXPORTS_ROOT, JOBS_ENABLED=False)
+class ShoppingListExportTests(APITestCase):
+    """Выгрузки доступны только владельцу и удаляются по сроку"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.stranger = create_users(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(EXPORTS_ROOT, ignore_errors=True)
+
+    def export(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(
+            '/api/recipes/export_shopping_cart/', {'format': 'txt'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'done')
+        return response.data
+
+    def test_download_by_owner_only(self):
+        job = self.export()
+        url = job['result']['url']
+        self.assertNotIn('/media/', url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Список покупок', b''.join(
+            response.streaming_content).decode())
+        self.client.force_authenticate(self.stranger)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    @override_settings(SHOPPING_LIST_EXPORT_TTL=60)
+    def test_expired_exports_deleted(self):
+        storage = get_export_storage()
+        directory = f'shopping_lists/{self.owner.pk}'
+        shutil.rmtree(storage.path(directory), ignore_errors=True)
+        self.export()
+        name = storage.listdir(directory)[1][0]
+        self.assertEqual(delete_expired_exports(), 0)
+        stale = time.time() - 120
+        os.utime(storage.path(f'{directory}/{name}'), (stale, stale))
+        self.assertEqual(delete_expired_exports(), 1)
+        self.assertEqual(storage.listdir(directory)[1], [])
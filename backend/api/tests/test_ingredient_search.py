@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient
+
+
+class IngredientSearchTests(APITestCase):
+    """Поиск ингредиентов по началу названия без учета регистра"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('Соль', 'соль морская', 'Сода', 'сахар', 'Масло',
+                     'фасоль'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = self.client.get('/api/ingredients/', query)
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_prefix_ignores_case(self):
+        for name in ('сол', 'СОЛ', 'сОл'):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.search({'name': name}), ['Соль', 'соль морская'])
+        self.assertEqual(self.search({'name': 'МАС'}), ['Масло'])
+        self.assertEqual(self.search({'name': 'оль'}), [])
+
+    def test_order_and_limit(self):
+        self.assertEqual(
+            self.search({'name': 'с'}),
+            ['сахар', 'Сода', 'Соль', 'соль морская'])
+        self.assertEqual(
+            self.search({'name': 'С', 'limit': 2}), ['сахар', 'Сода'])
+
+    def test_index_serves_without_queries(self):
+        self.search({'name': 'с'})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search({'name': 'Ф'}), ['фасоль'])
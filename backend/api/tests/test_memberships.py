@@ -0,0 +1,113 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_user, create_users
+from recipes.memberships import get_membership_key
+from recipes.models import Favorite, Follow, Recipe, ShoppingCart
+
+
+class MembershipDeleteTests(APITestCase):
+    """Удаление отсутствующей связи не создает строк и не меняет
+    счетчики"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author = create_users(2)
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание',
+            cooking_time=1)
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def assertCounters(self, favorites, carts, followers):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.favorites_count, self.recipe.carts_count,
+             self.author.followers_count),
+            (favorites, carts, followers))
+
+    def test_delete_twice(self):
+        urls = (
+            f'/api/recipes/{self.recipe.pk}/favorite/',
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+            f'/api/users/{self.author.pk}/subscribe/',
+        )
+        for url in urls:
+            self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertCounters(1, 1, 1)
+        for _ in range(2):
+            for url in urls:
+                self.assertEqual(self.client.delete(url).status_code, 204)
+            self.assertCounters(0, 0, 0)
+        self.assertFalse(Favorite.objects.exists())
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+
+
+class MembershipCacheTests(APITestCase):
+    """Записи меняют версию закэшированных множеств, фильтры идут по базе"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.reader, name=f'Рецепт {number}',
+                text='Описание', cooking_time=1)
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.reader)
+
+    def get_ids(self, query):
+        response = self.client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def get_key(self):
+        return get_membership_key(self.reader.pk, 'favorites')
+
+    def get_favorited(self):
+        response = self.client.get('/api/recipes/')
+        return {
+            recipe['id'] for recipe in response.data['results']
+            if recipe['is_favorited']
+        }
+
+    def test_writes_bump_version(self):
+        first, second, _ = [recipe.pk for recipe in self.recipes]
+        self.assertEqual(self.get_favorited(), set())
+        key = self.get_key()
+        self.assertEqual(cache.get(key), frozenset())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{first}/favorite/')
+            self.client.post(
+                '/api/recipes/favorite/', {'ids': [second]}, format='json')
+        self.assertNotEqual(self.get_key(), key)
+        self.assertEqual(self.get_favorited(), {first, second})
+        self.assertEqual(cache.get(self.get_key()), {first, second})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{first}/favorite/')
+        self.assertEqual(self.get_favorited(), {second})
+
+    def test_stale_load_not_read(self):
+        """Множество, загруженное до коммита записи, не читается после"""
+        first = self.recipes[0].pk
+        key = self.get_key()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{first}/favorite/')
+        cache.set(key, frozenset())
+        self.assertEqual(self.get_favorited(), {first})
+
+    def test_filters(self):
+        first, second, third = [recipe.pk for recipe in self.recipes]
+        Favorite.objects.create(user=self.reader, recipe_id=first)
+        ShoppingCart.objects.create(user=self.reader, recipe_id=second)
+        self.assertEqual(self.get_ids('is_favorited=1'), {first})
+        self.assertEqual(self.get_ids('is_in_shopping_cart=1'), {second})
+        self.assertEqual(self.get_ids('is_favorited=0'),
+                         {first, second, third})
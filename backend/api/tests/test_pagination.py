@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_user
+from recipes.counters import reconcile_counters
+from recipes.models import Recipe
+
+RECIPES = 7
+
+
+class CursorPaginationTests(APITestCase):
+    """Обход списка по курсору выдает каждый объект ровно один раз"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=1)
+            for number in range(RECIPES)
+        ]
+        reconcile_counters()
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_walk_in_pk_order(self):
+        ids, pages = self.walk('/api/recipes/?cursor=&limit=3')
+        self.assertEqual(
+            ids, sorted((recipe.pk for recipe in self.recipes), reverse=True))
+        self.assertEqual(pages, 3)
+
+    def test_count_on_request(self):
+        response = self.client.get('/api/recipes/?cursor=&limit=3&count=1')
+        self.assertEqual(response.data['count'], RECIPES)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get('/api/recipes/?page=3&limit=3')
+        self.assertEqual(response.data['count'], RECIPES)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[0].pk])
@@ -0,0 +1,353 @@
+import json
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from foodgram.testing import PASSWORD, create_users, get_image
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.counters import reconcile_counters
+from recipes.feed import rebuild_feeds
+from recipes.models import (
+    Favorite, Follow, Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+    Tag
+    )
+from recipes.search import rebuild_search_index
+from recipes.tag_masks import update_tags_masks
+
+PAGE_SIZES = (1, 6, 24)
+USERS = 12
+RECIPES_PER_AUTHOR = 8
+INGREDIENTS = 40
+INGREDIENTS_PER_RECIPE = 6
+LARGE_TABLES = {
+    'recipes_recipe',
+    'recipes_recipeingredient',
+    'recipes_recipe_tags',
+    'recipes_favorite',
+    'recipes_shoppingcart',
+    'recipes_shoppingcarttotal',
+    'recipes_follow',
+}
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def seed():
+    """Набор данных, на котором видны N+1: на страницах больше одного
+    объекта"""
+    tags = [
+        Tag.objects.create(name=f'Тег {number}', color=f'#0000{number:02d}',
+                           slug=f'tag{number}')
+        for number in range(3)
+    ]
+    ingredients = [
+        Ingredient.objects.create(
+            name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(INGREDIENTS)
+    ]
+    users = create_users(USERS)
+    recipes = [
+        Recipe.objects.create(
+            author=author, name=f'Рецепт {author.pk}-{number}',
+            text='Описание рецепта', cooking_time=10,
+            image='recipes/seed.png')
+        for author in users
+        for number in range(RECIPES_PER_AUTHOR)
+    ]
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient=ingredients[
+                (index + offset) % INGREDIENTS],
+            amount=10 + offset)
+        for index, recipe in enumerate(recipes)
+        for offset in range(INGREDIENTS_PER_RECIPE)
+    ])
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for index, recipe in enumerate(recipes)
+        for tag in tags[:1 + index % len(tags)]
+    ])
+    reader = users[0]
+    Follow.objects.bulk_create([
+        Follow(user=reader, author=author) for author in users[1:]
+    ])
+    Favorite.objects.bulk_create([
+        Favorite(user=reader, recipe=recipe) for recipe in recipes[::2]
+    ])
+    ShoppingCart.objects.bulk_create([
+        ShoppingCart(user=reader, recipe=recipe) for recipe in recipes[::3]
+    ])
+    reconcile_counters()
+    rebuild_cart_totals()
+    rebuild_search_index(recipe.pk for recipe in recipes)
+    update_tags_masks(recipe.pk for recipe in recipes)
+    rebuild_feeds()
+    return users, recipes, ingredients, tags
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT, SHOPPING_LIST_EXPORTS_ROOT=MEDIA_ROOT)
+class QueryCountTests(APITestCase):
+    """Число SQL-запросов на маршрут ограничено и не растет с размером
+    страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users, cls.recipes, cls.ingredients, cls.tags = seed()
+        cls.reader = cls.users[0]
+        cls.author = cls.users[1]
+        cls.stranger = cls.users[-1]
+        cls.token = Token.objects.create(user=cls.reader)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.anon = APIClient()
+        self.user = APIClient()
+        self.user.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.clients = {'anon': self.anon, 'user': self.user}
+
+    def request(self, client, method, url, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, context.captured_queries
+
+    def assertQueriesAtMost(self, bound, client, method, url,
+                            status=200, **kwargs):
+        response, queries = self.request(client, method, url, **kwargs)
+        self.assertEqual(response.status_code, status, (url, response))
+        self.assertLessEqual(
+            len(queries), bound,
+            f'{method.upper()} {url}: {len(queries)} запросов:\n'
+            + '\n'.join(query['sql'] for query in queries))
+        return response, queries
+
+    def assertPageQueries(self, bound, client, url):
+        """Одинаковое число запросов для всех размеров страницы"""
+        counts = {}
+        for page_size in PAGE_SIZES:
+            separator = '&' if '?' in url else '?'
+            cache.clear()
+            response, queries = self.assertQueriesAtMost(
+                bound, client, 'get', f'{url}{separator}limit={page_size}')
+            self.assertTrue(response.data['results'], url)
+            counts[page_size] = len(queries)
+        self.assertEqual(len(set(counts.values())), 1, (url, counts))
+
+    def test_reference_routes(self):
+        tag = self.tags[0]
+        ingredient = self.ingredients[0]
+        routes = (
+            (1, '/api/tags/'),
+            (1, f'/api/tags/{tag.pk}/'),
+            (1, '/api/ingredients/'),
+            (1, '/api/ingredients/?name=ингр'),
+            (1, f'/api/ingredients/{ingredient.pk}/'),
+        )
+        for name, client in self.clients.items():
+            for bound, url in routes:
+                with self.subTest(client=name, url=url):
+                    cache.clear()
+                    self.assertQueriesAtMost(
+                        bound + (name == 'user'), client, 'get', url)
+
+    def test_recipe_list(self):
+        tags = self.tags
+        routes = (
+            (5, '/api/recipes/'),
+            (4, '/api/recipes/?cursor='),
+            (7, f'/api/recipes/?tags={tags[0].slug}&tags={tags[1].slug}'),
+            (6, f'/api/recipes/?author={self.author.pk}'),
+            (5, '/api/recipes/?search=рецепт'),
+            (5, '/api/recipes/?ordering=-favorites_count'),
+        )
+        for name, client in self.clients.items():
+            for bound, url in routes:
+                with self.subTest(client=name, url=url):
+                    self.assertPageQueries(
+                        bound + 4 * (name == 'user'), client, url)
+
+    def test_recipe_list_user_filters(self):
+        for url in ('/api/recipes/?is_favorited=1',
+                    '/api/recipes/?is_in_shopping_cart=1'):
+            with self.subTest(url=url):
+                self.assertPageQueries(9, self.user, url)
+
+    def test_recipe_detail(self):
+        recipe = self.recipes[0]
+        for name, client in self.clients.items():
+            with self.subTest(client=name):
+                self.assertQueriesAtMost(
+                    4 + 4 * (name == 'user'),
+                    client, 'get', f'/api/recipes/{recipe.pk}/')
+
+    def test_user_routes(self):
+        url = f'/api/users/{self.author.pk}/'
+        self.assertQueriesAtMost(1, self.anon, 'get', url)
+        self.assertQueriesAtMost(3, self.user, 'get', url)
+        self.assertPageQueries(4, self.user, '/api/users/')
+        self.assertQueriesAtMost(2, self.user, 'get', '/api/users/me/')
+
+    def test_subscriptions(self):
+        for recipes_limit in ('', '&recipes_limit=2'):
+            url = f'/api/users/subscriptions/?count=1{recipes_limit}'
+            with self.subTest(url=url):
+                self.assertPageQueries(4, self.user, url)
+
+    def test_feed(self):
+        self.assertPageQueries(8, self.user, '/api/recipes/feed/')
+
+    def test_shopping_cart_routes(self):
+        routes = (
+            (2, 'get', '/api/recipes/shopping_cart_summary/'),
+            (2, 'get', '/api/recipes/download_shopping_cart/?format=txt'),
+            (2, 'get', '/api/recipes/download_shopping_cart/?format=csv'),
+            (2, 'get', '/api/jobs/'),
+        )
+        for bound, method, url in routes:
+            with self.subTest(url=url):
+                self.assertQueriesAtMost(bound, self.user, method, url)
+        self.assertQueriesAtMost(
+            10, self.user, 'post', '/api/recipes/export_shopping_cart/',
+            status=202, data={'format': 'csv'})
+
+    def test_anonymous_private_routes(self):
+        for url in ('/api/users/',
+                    '/api/users/me/',
+                    '/api/users/subscriptions/',
+                    '/api/recipes/feed/',
+                    '/api/recipes/shopping_cart_summary/',
+                    '/api/recipes/download_shopping_cart/',
+                    '/api/jobs/'):
+            with self.subTest(url=url):
+                self.assertQueriesAtMost(0, self.anon, 'get', url, status=401)
+
+    def test_membership_writes(self):
+        recipe = self.recipes[-1]
+        author = self.stranger
+        routes = (
+            (11, 'post', f'/api/recipes/{recipe.pk}/favorite/', 201),
+            (7, 'delete', f'/api/recipes/{recipe.pk}/favorite/', 204),
+            (14, 'post', f'/api/recipes/{recipe.pk}/shopping_cart/', 201),
+            (12, 'delete', f'/api/recipes/{recipe.pk}/shopping_cart/', 204),
+            (8, 'delete', f'/api/users/{author.pk}/subscribe/', 204),
+            (15, 'post', f'/api/users/{author.pk}/subscribe/', 201),
+        )
+        for bound, method, url, status in routes:
+            with self.subTest(method=method, url=url):
+                self.assertQueriesAtMost(
+                    bound, self.user, method, url, status=status)
+
+    def test_batch_membership_writes(self):
+        """Пакетные маршруты: запросов столько же, сколько на один id"""
+        recipes = [recipe.pk for recipe in self.recipes[-6:]]
+        authors = [author.pk for author in self.users[1:]]
+        routes = (
+            (8, 'post', '/api/recipes/favorite/', recipes),
+            (11, 'post', '/api/recipes/shopping_cart/', recipes),
+            (11, 'delete', '/api/recipes/shopping_cart/', recipes),
+            (9, 'delete', '/api/users/subscribe/', authors),
+            (11, 'post', '/api/users/subscribe/', authors),
+        )
+        for bound, method, url, ids in routes:
+            for size in (1, len(ids)):
+                with self.subTest(method=method, url=url, size=size):
+                    self.assertQueriesAtMost(
+                        bound, self.user, method, url,
+                        data={'ids': ids[:size] + [10 ** 9]},
+                        format='json')
+
+    def test_recipe_writes(self):
+        data = {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 5}
+                for ingredient in self.ingredients[:INGREDIENTS_PER_RECIPE]
+            ],
+            'tags': [tag.pk for tag in self.tags],
+            'image': get_image(),
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+        response, _ = self.assertQueriesAtMost(
+            18, self.user, 'post', '/api/recipes/', status=201,
+            data=data, format='json')
+        url = f'/api/recipes/{response.data["id"]}/'
+        data['ingredients'] = [
+            {'id': ingredient.pk, 'amount': 7}
+            for ingredient in self.ingredients[3:3 + INGREDIENTS_PER_RECIPE]
+        ]
+        self.assertQueriesAtMost(
+            19, self.user, 'patch', url, data=data, format='json')
+        self.assertQueriesAtMost(
+            17, self.user, 'delete', url, status=204)
+
+    def test_account_writes(self):
+        self.assertQueriesAtMost(
+            3, self.user, 'post', '/api/users/set_password/', status=204,
+            data={'new_password': 'pass12345YY'})
+        self.assertQueriesAtMost(
+            6, self.anon, 'post', '/api/auth/token/login/',
+            data={'email': self.stranger.email, 'password': PASSWORD})
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']
+
+    def get_seq_scans(self, plan):
+        scans = []
+        if (plan.get('Node Type') == 'Seq Scan'
+                and plan.get('Relation Name') in LARGE_TABLES):
+            scans.append(plan['Relation Name'])
+        for child in plan.get('Plans', []):
+            scans.extend(self.get_seq_scans(child))
+        return scans
+
+    def test_query_plans(self):
+        """На PostgreSQL основные запросы не читают большие таблицы целиком.
+
+        Seq Scan ищется при enable_seqscan = off: на маленьком наборе
+        данных планировщик выбрал бы его и при наличии индекса.
+        """
+        if connection.vendor != 'postgresql':
+            self.skipTest('EXPLAIN проверяется только на PostgreSQL')
+        recipe = self.recipes[0]
+        urls = (
+            (self.anon, '/api/recipes/?limit=6'),
+            (self.anon, f'/api/recipes/?tags={self.tags[0].slug}'),
+            (self.anon, f'/api/recipes/?author={self.author.pk}'),
+            (self.anon, '/api/recipes/?search=рецепт'),
+            (self.user, f'/api/recipes/{recipe.pk}/'),
+            (self.user, '/api/recipes/?is_favorited=1'),
+            (self.user, '/api/users/subscriptions/?recipes_limit=3'),
+            (self.user, '/api/recipes/shopping_cart_summary/'),
+            (self.user, '/api/recipes/download_shopping_cart/?format=txt'),
+        )
+        problems = []
+        for client, url in urls:
+            cache.clear()
+            _, queries = self.request(client, 'get', url)
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                scans = self.get_seq_scans(self.explain(sql))
+                if scans:
+                    problems.append(f'{url}: {", ".join(scans)}\n{sql}')
+        self.assertFalse(problems, '\n\n'.join(problems))
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_user
+from recipes.counters import reconcile_counters
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+
+class RecipeUpdateTests(APITestCase):
+    """Обновление рецепта меняет только разницу в ингредиентах"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tag = Tag.objects.create(
+            name='Обед', color='#000001', slug='lunch')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(4)
+        ]
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание',
+            cooking_time=1)
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=cls.recipe, ingredient=ingredient,
+                             amount=10)
+            for ingredient in cls.ingredients[:3]
+        ])
+        reconcile_counters()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.author)
+
+    def get_rows(self):
+        return {
+            ingredient: (pk, amount)
+            for pk, ingredient, amount in RecipeIngredient.objects.filter(
+                recipe=self.recipe
+            ).values_list('pk', 'ingredient', 'amount')
+        }
+
+    def test_only_difference_changes(self):
+        kept, changed, removed, added = self.ingredients
+        before = self.get_rows()
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, {
+                'ingredients': [
+                    {'id': kept.pk, 'amount': 10},
+                    {'id': changed.pk, 'amount': 25},
+                    {'id': added.pk, 'amount': 5},
+                ],
+                'tags': [self.tag.pk],
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 1,
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+        after = self.get_rows()
+        self.assertEqual(after[kept.pk], before[kept.pk])
+        self.assertEqual(after[changed.pk], (before[changed.pk][0], 25))
+        self.assertNotIn(removed.pk, after)
+        self.assertEqual(after[added.pk][1], 5)
+        self.assertEqual(
+            sorted(
+                (ingredient['id'], ingredient['amount'])
+                for ingredient in self.client.get(url).data['ingredients']),
+            sorted((pk, amount) for pk, (_, amount) in after.items()))
+
+    def test_removal_only(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, {
+                'ingredients': [{'id': self.ingredients[0].pk, 'amount': 10}],
+                'tags': [self.tag.pk],
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 1,
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [ingredient['id']
+             for ingredient in self.client.get(url).data['ingredients']],
+            [self.ingredients[0].pk])
@@ -0,0 +1,77 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_user, get_image
+from recipes.counters import reconcile_counters
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+MISSING = 10 ** 9
+
+
+class RecipeValidationTests(APITestCase):
+    """Проверка id ингредиентов и тегов одним запросом и частичный PATCH"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tag = Tag.objects.create(
+            name='Обед', color='#000001', slug='lunch')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(3)
+        ]
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Описание',
+            cooking_time=1)
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredients[0], amount=1)
+        reconcile_counters()
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+
+    def test_missing_ids_reported_together(self):
+        ids = [ingredient.pk for ingredient in self.ingredients]
+        data = {
+            'ingredients': [
+                {'id': pk, 'amount': 1} for pk in ids + [MISSING + 1, MISSING]
+            ],
+            'tags': [self.tag.pk, MISSING],
+            'image': get_image(),
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 1,
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/recipes/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [str(error) for error in response.data['ingredients']],
+            [f'Несуществующие ингредиенты: {MISSING}, {MISSING + 1}'])
+        self.assertEqual(
+            [str(error) for error in response.data['tags']],
+            [f'Несуществующие теги: {MISSING}'])
+        for table in ('recipes_ingredient', 'recipes_tag'):
+            with self.subTest(table=table):
+                self.assertEqual(len([
+                    query for query in context.captured_queries
+                    if f'FROM "{table}"' in query['sql']
+                ]), 1)
+
+    def test_partial_update(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        response = self.client.patch(url, {'name': 'Другой'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Другой')
+        self.assertEqual(
+            list(self.recipe.recipe_set.values_list('ingredient', 'amount')),
+            [(self.ingredients[0].pk, 1)])
+
+        response = self.client.patch(
+            url, {'cooking_time': 0, 'tags': []}, format='json')
+        self.assertEqual(response.status_code, 400)
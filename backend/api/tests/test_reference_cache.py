@@ -0,0 +1,27 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient
+
+
+class ReferenceCacheTests(APITestCase):
+    """Кэш справочников сбрасывается только после коммита записи"""
+
+    def setUp(self):
+        cache.clear()
+
+    def get_ingredients(self):
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_uncommitted_write_keeps_cached_list(self):
+        etag = self.get_ingredients()['ETag']
+        with self.captureOnCommitCallbacks() as callbacks:
+            Ingredient.objects.create(name='соль', measurement_unit='г')
+            self.assertEqual(self.get_ingredients()['ETag'], etag)
+        for callback in callbacks:
+            callback()
+        response = self.get_ingredients()
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'соль')
@@ -0,0 +1,33 @@
+import asyncio
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api.async_views import run_blocking
+from foodgram.middleware import RequestTiming, current_timing
+from recipes.models import Tag
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True)
+class RequestTimingTests(TestCase):
+    """Запросы к базе считаются и в потоке запроса, и в пуле"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertRegex(response['Server-Timing'], r'"[1-9]\d* queries"')
+
+    def test_pool_queries_counted(self):
+        self.client.get('/api/tags/')
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        try:
+            count = asyncio.run(run_blocking(Tag.objects.count))
+        finally:
+            current_timing.reset(token)
+        self.assertEqual(count, 0)
+        self.assertEqual(timing.queries, 1)
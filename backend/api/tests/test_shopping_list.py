@@ -0,0 +1,86 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from api import shopping_list
+from foodgram.checks import check_shopping_list_font
+from foodgram.testing import create_user
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.counters import reconcile_counters
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, ShoppingCartTotal
+    )
+
+MISSING_FONT = '/nonexistent/DejaVuSans.ttf'
+
+
+@mock.patch.object(shopping_list, '_pdf_font', None)
+class PdfFontTests(SimpleTestCase):
+    """PDF без шрифта с кириллицей не формируется"""
+
+    @override_settings(SHOPPING_LIST_FONT=MISSING_FONT)
+    def test_missing_font_fails(self):
+        with self.assertRaises(ImproperlyConfigured):
+            shopping_list.stream_pdf([])
+        self.assertEqual(
+            [error.id for error in check_shopping_list_font(None)],
+            ['foodgram.W001'])
+        # Без шрифта запускаются check, migrate и runserver
+        call_command('check', stdout=StringIO(), stderr=StringIO())
+
+    def test_pdf_rendered(self):
+        content = b''.join(shopping_list.stream_pdf([('соль', 'г', 5)]))
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(check_shopping_list_font(None), [])
+
+
+class ShoppingListUnitsTests(APITestCase):
+    """Граммы и килограммы одного продукта складываются в одну строку с
+    учетом порций"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.grams = Ingredient.objects.create(
+            name='мука', measurement_unit='г')
+        cls.kilograms = Ingredient.objects.create(
+            name='мука', measurement_unit='кг')
+        cls.recipes = []
+        for ingredient, amount in ((cls.grams, 500), (cls.kilograms, 1)):
+            recipe = Recipe.objects.create(
+                author=cls.reader, name='Хлеб', text='Описание',
+                cooking_time=1)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount)
+            cls.recipes.append(recipe)
+        reconcile_counters()
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def test_units_and_servings(self):
+        grams, kilograms = self.recipes
+        url = '/api/recipes/download_shopping_cart/?format=csv'
+        for servings, recipe, total in ((2, grams, 1000),
+                                        (None, kilograms, 2000),
+                                        (3, kilograms, 4000)):
+            data = {'servings': servings} if servings else {}
+            response = self.client.post(
+                f'/api/recipes/{recipe.pk}/shopping_cart/', data,
+                format='json')
+            self.assertEqual(response.data['servings'], servings or 1)
+            response = self.client.get(url)
+            self.assertEqual(
+                b''.join(response.streaming_content).decode().splitlines(),
+                ['Ингредиент,Количество,Ед. изм.', f'мука,{total},г'])
+        self.client.delete(f'/api/recipes/{grams.pk}/shopping_cart/')
+        totals = list(ShoppingCartTotal.objects.filter(
+            user=self.reader).values_list('ingredient', 'amount'))
+        self.assertEqual(totals, [(self.kilograms.pk, 3)])
+        rebuild_cart_totals()
+        self.assertEqual(totals, list(ShoppingCartTotal.objects.filter(
+            user=self.reader).values_list('ingredient', 'amount')))
@@ -0,0 +1,50 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_users
+from recipes.counters import reconcile_counters
+from recipes.models import Follow, Recipe
+
+
+@override_settings(RECIPES_LIMIT_DEFAULT=3, RECIPES_LIMIT_MAX=5)
+class SubscriptionRecipesLimitTests(APITestCase):
+    """Превью рецептов в подписках всегда ограничено сервером"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author = create_users(2)
+        Recipe.objects.bulk_create([
+            Recipe(author=cls.author, name=f'Рецепт {number}',
+                   text='Описание', cooking_time=1)
+            for number in range(8)
+        ])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        reconcile_counters()
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def get_recipes(self, query=''):
+        response = self.client.get(f'/api/users/subscriptions/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'][0]['recipes']
+
+    def test_default_limit(self):
+        self.assertEqual(len(self.get_recipes()), 3)
+
+    def test_requested_limit(self):
+        recipes = self.get_recipes('?recipes_limit=2')
+        self.assertEqual(len(recipes), 2)
+        newest = Recipe.objects.filter(author=self.author).order_by('-pk')
+        self.assertEqual([recipe['id'] for recipe in recipes],
+                         [recipe.pk for recipe in newest[:2]])
+
+    def test_maximum_limit(self):
+        self.assertEqual(len(self.get_recipes('?recipes_limit=100')), 5)
+
+    def test_subscribe_response(self):
+        self.client.delete(f'/api/users/{self.author.pk}/subscribe/')
+        response = self.client.post(
+            f'/api/users/{self.author.pk}/subscribe/?recipes_limit=100')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['recipes']), 5)
@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import get_async_urls
 from .views import (
     FoodgramUserViewSet, TagsViewSet,
-    RecipesViewSet, IngredientsViewSet
+    RecipesViewSet, IngredientsViewSet, JobsViewSet
     )
 
 app_name = 'api'
@@ -13,13 +15,18 @@ router.register('users', FoodgramUserViewSet, basename='users')
 router.register('tags', TagsViewSet, basename='tags')
 router.register('recipes', RecipesViewSet, basename='recipes')
 router.register('ingredients', IngredientsViewSet, basename='ingredients')
+router.register('jobs', JobsViewSet, basename='jobs')
 router.register(r'recipes/(?P<recipe_id>.+)',
                 RecipesViewSet, basename='favorite')
 router.register(r'users/(?P<user_id>.+)',
                 FoodgramUserViewSet, basename='follow')
 
+router_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = get_async_urls(router_urls)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
\ No newline at end of file
@@ -1,6 +1,13 @@
+import os
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
-from django.db.models import Sum
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.db import transaction
+from django.db.models import (
+    F, Prefetch, Window
+    )
+from django.db.models.functions import RowNumber
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 from rest_framework import permissions, status, viewsets
@@ -9,17 +16,41 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from djoser import views
 from django.shortcuts import get_object_or_404
 
+from api.mixins import VersionedListMixin
+from api.pagination import LimitCursorPagination
 from api.permissions import IsAdminAuthorOrReadOnly
-from api.filters import IngredientFilter, RecipeFilter
+from api.recipe_cache import get_recipe_rows, get_recipes_representation
+from api.tasks import get_export_storage
+from api.shopping_list import (
+    SHOPPING_LIST_STREAMS, CsvShoppingListRenderer,
+    PdfShoppingListRenderer, TxtShoppingListRenderer, get_shopping_list,
+    spool
+    )
+from api.filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from jobs.models import Job
+from jobs.registry import enqueue
+from recipes.batch import CREATED, DELETED, change_memberships, lock_user
+from recipes.cart_totals import (
+    add_to_cart_totals, get_recipe_amounts, update_recipe_in_cart_totals
+    )
+from recipes.counters import change_counter
+from recipes.feed import (
+    add_authors_to_feed, get_feed, remove_authors_from_feed
+    )
+from recipes.indexes import ingredient_index
+from recipes.locks import lock_recipes
+from recipes.memberships import update_memberships
 from recipes.models import (
     Tag, Recipe, Ingredient,
     Follow, Favorite, ShoppingCart,
-    RecipeIngredient
+    RecipeIngredient, ShoppingCartTotal
     )
 from .serializers import (
     SmallReadRecipeSerializer, ReadRecipeSerializer,
     UsersSerializer, PasswordSerializer, TagSerializer,
-    CreateUpdateRecipeSerializer, IngredientSerializer, FollowSerializer
+    CreateUpdateRecipeSerializer, IngredientSerializer, FollowSerializer,
+    ShoppingCartTotalSerializer, JobSerializer, BatchIdsSerializer,
+    ServingsSerializer
     )
 
 
@@ -27,16 +58,84 @@ User = get_user_model()
 SAFE_METHODS = ['GET', 'HEAD', 'OPTIONS']
 
 
-class TagsViewSet(viewsets.ModelViewSet):
+def get_query_limit(request, param='limit'):
+    """Достает из запроса положительный целочисленный лимит"""
+    try:
+        limit = int(request.query_params.get(param))
+    except (TypeError, ValueError):
+        return None
+    return limit if limit > 0 else None
+
+
+def get_recipes_limit(request):
+    """recipes_limit из запроса, по умолчанию и не больше заданных в
+    настройках"""
+    limit = (get_query_limit(request, 'recipes_limit')
+             or settings.RECIPES_LIMIT_DEFAULT)
+    return min(limit, settings.RECIPES_LIMIT_MAX)
+
+
+def batch_response(request, kind):
+    """Пакетное добавление (POST) или удаление (DELETE) связей kind.
+
+    Все id проверяются и меняются в одной транзакции, в ответе — статус
+    по каждому id.
+    """
+    serializer = BatchIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        results = change_memberships(
+            request.user, kind, serializer.validated_data['ids'],
+            add=request.method == 'POST')
+        changed = [
+            pk for pk, result in results.items()
+            if result in (CREATED, DELETED)
+        ]
+        if request.method == 'POST':
+            update_memberships(request, kind, added=changed)
+        else:
+            update_memberships(request, kind, removed=changed)
+    return Response({'results': [
+        {'id': pk, 'status': result} for pk, result in results.items()
+    ]})
+
+
+def get_recipes_preview(authors, recipes_limit):
+    """Последние recipes_limit рецептов авторов одним запросом с ROW_NUMBER
+    по автору"""
+    if not authors:
+        return {}
+    ranked = Recipe.objects.filter(author__in=authors).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=F('pk').desc(),
+        )
+    ).order_by()
+    sql, params = ranked.query.sql_with_params()
+    query = (f'SELECT * FROM ({sql}) ranked '
+             f'WHERE ranked.row_number <= %s '
+             f'ORDER BY ranked.author_id, ranked.row_number')
+    params += (recipes_limit, )
+
+    recipes_preview = {}
+    for recipe in Recipe.objects.raw(query, params):
+        recipes_preview.setdefault(recipe.author_id, []).append(recipe)
+    return recipes_preview
+
+
+class TagsViewSet(VersionedListMixin, viewsets.ModelViewSet):
     """Работа с тегами"""
+    version_name = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny, )
     pagination_class = None
 
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+class IngredientsViewSet(VersionedListMixin, viewsets.ModelViewSet):
     """Работа с ингредиентами"""
+    version_name = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny, )
@@ -44,6 +143,34 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def get_list_data(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        limit = get_query_limit(request)
+        if name:
+            return ingredient_index.search(name, limit)
+        return ingredient_index.all()[:limit]
+
+
+class JobsViewSet(viewsets.ReadOnlyModelViewSet):
+    """Статусы фоновых задач пользователя"""
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated, )
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
+
+    @action(['get'], detail=True)
+    def download(self, request, pk=None):
+        """Файл, созданный задачей, только для ее владельца"""
+        job = self.get_object()
+        name = (job.result or {}).get('file')
+        storage = get_export_storage()
+        if job.status != Job.DONE or not name or not storage.exists(name):
+            raise Http404
+        return FileResponse(
+            storage.open(name), as_attachment=True,
+            filename=f'shopping_list{os.path.splitext(name)[1]}')
+
 
 @permission_classes([permissions.AllowAny])
 class FoodgramUserViewSet(views.UserViewSet):
@@ -58,25 +185,37 @@ class FoodgramUserViewSet(views.UserViewSet):
     @action(['get'],
             detail=False,
             url_path='me',
+            permission_classes=[IsAuthenticated, ]
             )
     def me(self, request):
         user = request.user
+        # Пользователь может прийти из кэша токенов со старыми счетчиками
+        user.refresh_from_db(fields=['recipes_count', 'followers_count'])
         serializer = FollowSerializer(user)
         return Response(serializer.data)
 
     @action(['get'],
             detail=False,
             url_path='subscriptions',
+            permission_classes=[IsAuthenticated, ]
             )
     def subscriptions(self, request):
-        queryset = User.objects.filter(following__user=request.user)
+        queryset = Follow.objects.filter(
+            user=request.user).select_related('author')
+        recipes_limit = get_recipes_limit(request)
 
         page = self.paginate_queryset(queryset)
+        follows = page if page is not None else list(queryset)
+        authors = [follow.author for follow in follows]
+        for author in authors:
+            author.is_subscribed = True
+        serializer = FollowSerializer(authors, many=True, context={
+            'request': request,
+            'recipes_limit': recipes_limit,
+            'recipes_preview': get_recipes_preview(authors, recipes_limit),
+        })
         if page is not None:
-            serializer = FollowSerializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-
-        serializer = FollowSerializer(queryset, many=True)
         return Response(serializer.data)
 
     @action(['post'],
@@ -89,7 +228,7 @@ class FoodgramUserViewSet(views.UserViewSet):
 
         serializer.is_valid(raise_exception=True)
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(['post', 'delete'],
@@ -99,23 +238,91 @@ class FoodgramUserViewSet(views.UserViewSet):
     def subscribe(self, request, id=None):
         user = self.request.user
         author = get_object_or_404(User, pk=id)
-        follow, _ = Follow.objects.get_or_create(author=author, user=user)
+        with transaction.atomic():
+            lock_user(user)
+            if request.method == 'POST':
+                _, created = Follow.objects.get_or_create(
+                    author=author, user=user)
+                if created:
+                    change_counter(User, author.pk, 'followers_count', 1)
+                    add_authors_to_feed(user.pk, [author.pk])
+                    update_memberships(request, 'follows', added=[author.pk])
+            else:
+                deleted, _ = Follow.objects.filter(
+                    author=author, user=user).delete()
+                if deleted:
+                    change_counter(User, author.pk, 'followers_count', -1)
+                    remove_authors_from_feed(user.pk, [author.pk])
+                    update_memberships(
+                        request, 'follows', removed=[author.pk])
 
         if request.method == 'POST':
-            serializer = FollowSerializer(author, context={'request': request})
+            author.refresh_from_db(fields=['followers_count'])
+            serializer = FollowSerializer(author, context={
+                'request': request,
+                'recipes_limit': get_recipes_limit(request),
+            })
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        follow.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(['post', 'delete'],
+            detail=False,
+            url_path='subscribe',
+            permission_classes=[IsAuthenticated, ]
+            )
+    def subscribe_batch(self, request):
+        return batch_response(request, 'follows')
+
 
 class RecipesViewSet(viewsets.ModelViewSet):
     """Работа с рецептами"""
     queryset = Recipe.objects.all()
     permission_classes = [IsAdminAuthorOrReadOnly, ]
     http_method_names = ['get', 'post', 'patch', 'delete']
-    filter_backends = [DjangoFilterBackend, ]
+    filter_backends = [DjangoFilterBackend, RecipeOrderingFilter]
     filterset_class = RecipeFilter
+    ordering_fields = ('pk', 'favorites_count', 'carts_count')
+    ordering = ('-pk', )
+
+    def get_queryset(self):
+        return Recipe.objects.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_set',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    def list(self, request, *args, **kwargs):
+        rows = get_recipe_rows(self.filter_queryset(Recipe.objects.all()))
+
+        page = self.paginate_queryset(rows)
+        data = get_recipes_representation(
+            page if page is not None else list(rows), request)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            row = get_recipe_rows(
+                Recipe.objects.filter(pk=kwargs['pk'])).first()
+        except (TypeError, ValueError):
+            row = None
+        if row is None:
+            raise Http404
+        return Response(get_recipes_representation([row], request)[0])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        lock_recipes([instance.pk])
+        # Автор блокируется в одном проходе с владельцами корзин
+        update_recipe_in_cart_totals(
+            instance, get_recipe_amounts(instance), {},
+            lock_user_ids=[instance.author_id])
+        change_counter(User, instance.author_id, 'recipes_count', -1)
+        instance.delete()
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
@@ -129,14 +336,29 @@ class RecipesViewSet(viewsets.ModelViewSet):
     def favorite(self, request, pk=None):
         user = self.request.user
         recipe = get_object_or_404(Recipe, pk=pk)
-        favorite, _ = Favorite.objects.get_or_create(recipe=recipe, user=user)
+        with transaction.atomic():
+            lock_recipes([recipe.pk])
+            lock_user(user)
+            if request.method == 'POST':
+                _, created = Favorite.objects.get_or_create(
+                    recipe=recipe, user=user)
+                if created:
+                    change_counter(Recipe, recipe.pk, 'favorites_count', 1)
+                    update_memberships(
+                        request, 'favorites', added=[recipe.pk])
+            else:
+                deleted, _ = Favorite.objects.filter(
+                    recipe=recipe, user=user).delete()
+                if deleted:
+                    change_counter(Recipe, recipe.pk, 'favorites_count', -1)
+                    update_memberships(
+                        request, 'favorites', removed=[recipe.pk])
 
         if request.method == 'POST':
             serializer = SmallReadRecipeSerializer(
                 recipe, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        favorite.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(['post', 'delete'],
@@ -146,35 +368,133 @@ class RecipesViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk=None):
         user = self.request.user
         recipe = get_object_or_404(Recipe, pk=pk)
-        shopping_cart, _ = ShoppingCart.objects.get_or_create(
-            recipe=recipe, user=user)
+        servings = None
+        if request.method == 'POST':
+            serializer = ServingsSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            servings = serializer.validated_data.get('servings')
+        with transaction.atomic():
+            # Пока рецепт заблокирован, его ингредиенты не меняются
+            lock_recipes([recipe.pk])
+            lock_user(user)
+            if request.method == 'POST':
+                shopping_cart, created = ShoppingCart.objects.get_or_create(
+                    recipe=recipe, user=user,
+                    defaults={'servings': servings or 1})
+                if created:
+                    add_to_cart_totals(user, recipe, shopping_cart.servings)
+                    change_counter(Recipe, recipe.pk, 'carts_count', 1)
+                    update_memberships(request, 'cart', added=[recipe.pk])
+                elif servings and servings != shopping_cart.servings:
+                    add_to_cart_totals(
+                        user, recipe, servings - shopping_cart.servings)
+                    shopping_cart.servings = servings
+                    shopping_cart.save(update_fields=['servings'])
+            else:
+                shopping_cart = ShoppingCart.objects.select_for_update(
+                ).filter(recipe=recipe, user=user).first()
+                deleted = 0
+                if shopping_cart is not None:
+                    deleted, _ = ShoppingCart.objects.filter(
+                        pk=shopping_cart.pk).delete()
+                if deleted:
+                    add_to_cart_totals(user, recipe, -shopping_cart.servings)
+                    change_counter(Recipe, recipe.pk, 'carts_count', -1)
+                    update_memberships(request, 'cart', removed=[recipe.pk])
 
         if request.method == 'POST':
             serializer = SmallReadRecipeSerializer(
                 recipe, context={'request': request})
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(
+                dict(serializer.data, servings=shopping_cart.servings),
+                status=status.HTTP_201_CREATED)
 
-        shopping_cart.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(['get'],
+            detail=False,
+            url_path='feed',
+            permission_classes=[IsAuthenticated, ],
+            pagination_class=LimitCursorPagination
+            )
+    def feed(self, request):
+        rows = get_recipe_rows(get_feed(request.user))
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(
+            get_recipes_representation(page, request))
+
+    @action(['post', 'delete'],
+            detail=False,
+            url_path='favorite',
+            permission_classes=[IsAuthenticated, ]
+            )
+    def favorite_batch(self, request):
+        return batch_response(request, 'favorites')
+
+    @action(['post', 'delete'],
+            detail=False,
+            url_path='shopping_cart',
+            permission_classes=[IsAuthenticated, ]
+            )
+    def shopping_cart_batch(self, request):
+        return batch_response(request, 'cart')
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated, ],
+        url_path='shopping_cart_summary'
+    )
+    def shopping_cart_summary(self, request):
+        totals = ShoppingCartTotal.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by('ingredient__name')
+        serializer = ShoppingCartTotalSerializer(totals, many=True)
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated, ],
+    )
+    def export_shopping_cart(self, request):
+        export_format = request.data.get('format', 'txt')
+        if export_format not in SHOPPING_LIST_STREAMS:
+            return Response(
+                {'format': [f'Доступные форматы: '
+                            f'{", ".join(SHOPPING_LIST_STREAMS)}']},
+                status=status.HTTP_400_BAD_REQUEST)
+        job = enqueue(
+            'api.export_shopping_list',
+            {'user_id': request.user.pk, 'format': export_format},
+            user=request.user,
+        )
+        serializer = JobSerializer(job, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[IsAuthenticated, ]
+        permission_classes=[IsAuthenticated, ],
+        renderer_classes=[
+            TxtShoppingListRenderer,
+            CsvShoppingListRenderer,
+            PdfShoppingListRenderer,
+        ]
     )
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(ingredient_amount=Sum('amount'))
-        shopping_list = ['Список покупок:\n']
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            unit = ingredient['ingredient__measurement_unit']
-            amount = ingredient['ingredient_amount']
-            shopping_list.append(f'\n{name} - {amount}, {unit}')
-        response = HttpResponse(shopping_list, content_type='text/plain')
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        content = SHOPPING_LIST_STREAMS[renderer.format](
+            get_shopping_list(request.user))
+        if settings.ASYNC_READ_VIEWS:
+            # Под ASGI поток читается в цикле событий, где ORM недоступна
+            response = FileResponse(spool(content), content_type=content_type)
+        else:
+            response = StreamingHttpResponse(
+                content, content_type=content_type)
         response['Content-Disposition'] = \
-            'attachment; filename="shopping_cart.txt"'
+            f'attachment; filename="shopping_cart.{renderer.format}"'
         return response
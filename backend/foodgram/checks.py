@@ -0,0 +1,55 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.core.exceptions import ImproperlyConfigured
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_CACHE_MESSAGE = (
+    'Кэш {backend} виден только одному процессу, а {reason}. Версии '
+    'данных, индексы и кэши ответов разойдутся между процессами: укажите '
+    'общий кэш в CACHE_BACKEND и CACHE_LOCATION (например, memcached).'
+)
+
+
+def is_cache_shared():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def get_shared_cache_error(reason):
+    return SHARED_CACHE_MESSAGE.format(
+        backend=settings.CACHES['default']['BACKEND'], reason=reason)
+
+
+def require_shared_cache(reason):
+    """Останавливает запуск нескольких процессов без общего кэша"""
+    if not is_cache_shared():
+        raise ImproperlyConfigured(get_shared_cache_error(reason))
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.JOBS_ENABLED and not is_cache_shared():
+        return [Error(
+            get_shared_cache_error('фоновые задачи выполняются в run_jobs'),
+            id='foodgram.E001',
+        )]
+    return []
+
+
+@register()
+def check_shopping_list_font(app_configs, **kwargs):
+    # Предупреждение, а не ошибка: без шрифта не работает только PDF
+    if not os.path.isfile(settings.SHOPPING_LIST_FONT):
+        return [Warning(
+            f'Шрифт для PDF {settings.SHOPPING_LIST_FONT} не найден, а '
+            'встроенные шрифты не содержат кириллицы: список покупок в PDF '
+            'будет недоступен.',
+            hint='Установите fonts-dejavu-core или укажите путь к TTF в '
+                 'SHOPPING_LIST_FONT.',
+            id='foodgram.W001',
+        )]
+    return []
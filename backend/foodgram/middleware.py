@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import os
+import traceback
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('foodgram.requests')
+slow_query_logger = logging.getLogger('foodgram.slow_queries')
+
+PROJECT_DIR = str(settings.BASE_DIR)
+
+# Счетчики текущего запроса. Контекст копируется в потоки пула
+# (api.async_views.run_blocking, sync_to_async), поэтому запросы к базе
+# из них тоже попадают в статистику своего запроса.
+current_timing = ContextVar('current_timing', default=None)
+
+
+def get_call_site():
+    """Ближайший к запросу кадр стека из кода проекта"""
+    for frame in reversed(traceback.extract_stack()):
+        if (frame.filename.startswith(PROJECT_DIR)
+                and frame.filename != __file__):
+            path = os.path.relpath(frame.filename, PROJECT_DIR)
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper соединений: учитывает запрос в текущем запросе"""
+    timing = current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestTiming:
+    """Счетчики одного запроса, собираемые через execute_wrapper"""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.view = None
+        self.action = None
+        self.view_started = None
+        self.view_finished = None
+        self.finished = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            if self.view_started is not None and self.view_finished is None:
+                self.view_db_time += duration
+            if duration * 1000 >= settings.SLOW_QUERY_MS:
+                slow_query_logger.warning(json.dumps({
+                    'view': self.view,
+                    'action': self.action,
+                    'duration_ms': round(duration * 1000, 1),
+                    'sql': sql,
+                    'call_site': get_call_site(),
+                }, ensure_ascii=False))
+
+    def get_durations(self):
+        """Длительности этапов в миллисекундах.
+
+        serialize — время view без SQL: во вьюсетах DRF это в основном
+        сериализация. render — от выхода из view до готового ответа.
+        """
+        durations = {'db': self.db_time}
+        if self.view_started is not None and self.view_finished is not None:
+            durations['serialize'] = max(
+                self.view_finished - self.view_started - self.view_db_time,
+                0.0)
+            durations['render'] = self.finished - self.view_finished
+        durations['total'] = self.finished - self.started
+        return {
+            name: round(duration * 1000, 1)
+            for name, duration in durations.items()
+        }
+
+
+class RequestTimingMiddleware:
+    """Число SQL-запросов и время этапов запроса в Server-Timing и в логе.
+
+    Включается настройкой REQUEST_TIMING_ENABLED. Работает и в WSGI, и в
+    ASGI без переключения в синхронный поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django 3.2 узнает асинхронный middleware
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        connection_created.connect(
+            install_query_recorder, dispatch_uid='foodgram.request_timing')
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timing, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    def start(self, request):
+        timing = RequestTiming()
+        request.timing = timing
+        for connection in connections.all():
+            install_query_recorder(connection)
+        return timing, current_timing.set(timing)
+
+    def finish(self, request, response, timing):
+        timing.finished = perf_counter()
+        durations = timing.get_durations()
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration}' + (
+                f';desc="{timing.queries} queries"' if name == 'db' else '')
+            for name, duration in durations.items()
+        )
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': timing.view,
+            'action': timing.action,
+            'queries': timing.queries,
+            **{f'{name}_ms': duration for name, duration in durations.items()},
+        }, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = request.timing
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is not None:
+            timing.view = view_class.__name__
+            actions = getattr(view_func, 'actions', None) or {}
+            timing.action = actions.get(request.method.lower())
+        else:
+            timing.view = getattr(view_func, '__name__', None)
+        timing.view_started = perf_counter()
+
+    def process_template_response(self, request, response):
+        request.timing.view_finished = perf_counter()
+        return response
@@ -27,10 +27,12 @@ INSTALLED_APPS = [
     'api',
     'users',
     'recipes',
+    'jobs',
     'django_filters',
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,6 +73,15 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -114,13 +125,69 @@ LENGTH_200 = 200
 LENGTH_150 = 150
 LENGTH_7 = 7
 MIN_TIME_COOK = 1
+MAX_SERVINGS = 100
+RECIPES_LIMIT_DEFAULT = 3
+RECIPES_LIMIT_MAX = 50
+REFERENCE_CACHE_TIMEOUT = 60 * 60
+RECIPE_CACHE_TIMEOUT = 60 * 60
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 10
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default='60'))
+RECIPE_IMAGE_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+RECIPE_IMAGE_QUALITY = 80
+JOBS_ENABLED = os.getenv('JOBS_ENABLED', default='False') == 'True'
+JOBS_WORKERS = int(os.getenv('JOBS_WORKERS', default='4'))
+JOBS_POOL_MODE = os.getenv('JOBS_POOL_MODE', default='thread')
+JOBS_POLL_INTERVAL = 1.0
+JOBS_MAX_ATTEMPTS = 3
+JOBS_LEASE_SECONDS = int(os.getenv('JOBS_LEASE_SECONDS', default='300'))
+SHOPPING_LIST_CHUNK_SIZE = 2000
+INGREDIENTS_BATCH_SIZE = 1000
+SHOPPING_LIST_SPOOL_SIZE = 1024 * 1024
+SHOPPING_LIST_EXPORTS_ROOT = os.getenv(
+    'SHOPPING_LIST_EXPORTS_ROOT', default=os.path.join(BASE_DIR, 'exports'))
+SHOPPING_LIST_EXPORT_TTL = 24 * 60 * 60
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
+SEARCH_BATCH_SIZE = 1000
+TAGS_MASK_ENUMERATION_LIMIT = 10
+BATCH_MAX_IDS = 100
+FEED_LENGTH = int(os.getenv('FEED_LENGTH', default='500'))
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', default='10000'))
+FEED_BATCH_SIZE = 1000
+REQUEST_TIMING_ENABLED = os.getenv(
+    'REQUEST_TIMING_ENABLED', default='False') == 'True'
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='False') == 'True'
+ASYNC_THREAD_POOL_SIZE = int(os.getenv('ASYNC_THREAD_POOL_SIZE', default='8'))
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', default='100'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram': {
+            'handlers': ['console'],
+            'level': os.getenv('FOODGRAM_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.LimitPagination',
     'PAGE_SIZE': 6,
@@ -0,0 +1,27 @@
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+from users.models import FoodgramUser
+
+PASSWORD = 'pass12345XX'
+
+
+def create_user(username, **fields):
+    """Пользователь для тестов с заполненными обязательными полями"""
+    return FoodgramUser.objects.create_user(
+        email=f'{username}@foodgram.ru', username=username,
+        first_name='Имя', last_name='Фамилия', password=PASSWORD, **fields)
+
+
+def create_users(count):
+    return [create_user(f'user{number}') for number in range(count)]
+
+
+def get_image():
+    """Картинка рецепта в base64, как ее присылает фронтенд"""
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
@@ -0,0 +1,11 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+
+
+def on_starting(server):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from foodgram.checks import require_shared_cache
+    if server.cfg.workers > 1:
+        require_shared_cache(f'воркеров gunicorn: {server.cfg.workers}')
@@ -0,0 +1,14 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+worker_class = 'uvicorn.workers.UvicornWorker'
+keepalive = 5
+raw_env = ['ASYNC_READ_VIEWS=True']
+
+
+def on_starting(server):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from foodgram.checks import require_shared_cache
+    if server.cfg.workers > 1:
+        require_shared_cache(f'воркеров gunicorn: {server.cfg.workers}')
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['pk', 'name', 'status', 'attempts', 'user', 'created']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'idempotency_key']
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from foodgram.checks import require_shared_cache
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Запуск обработчика фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.JOBS_WORKERS,
+            help='Размер пула обработчиков',
+        )
+        parser.add_argument(
+            '--mode',
+            choices=('thread', 'process'),
+            default=settings.JOBS_POOL_MODE,
+            help='Пул потоков или процессов',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза между опросами очереди, сек.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        require_shared_cache('задачи выполняются отдельно от веб-процессов')
+        self.stdout.write(
+            f'Обработчик задач: {options["workers"]} ({options["mode"]})')
+        Worker(
+            workers=options['workers'],
+            mode=options['mode'],
+            poll_interval=options['poll_interval'],
+        ).run(once=options['once'])
@@ -0,0 +1,94 @@
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+
+from users.models import FoodgramUser
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        verbose_name='Задача',
+        max_length=settings.LENGTH_200,
+    )
+    payload = models.JSONField(
+        verbose_name='Параметры',
+        default=dict,
+    )
+    idempotency_key = models.CharField(
+        verbose_name='Ключ идемпотентности',
+        max_length=settings.LENGTH_200,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    user = models.ForeignKey(
+        FoodgramUser,
+        related_name='jobs',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=settings.LENGTH_150,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток',
+        default=settings.JOBS_MAX_ATTEMPTS,
+    )
+    run_after = models.DateTimeField(
+        verbose_name='Запустить после',
+        default=timezone.now,
+    )
+    locked_until = models.DateTimeField(
+        verbose_name='Занята обработчиком до',
+        null=True,
+        blank=True,
+    )
+    result = models.JSONField(
+        verbose_name='Результат',
+        null=True,
+        blank=True,
+    )
+    error = models.TextField(
+        verbose_name='Ошибка',
+        blank=True,
+    )
+    created = models.DateTimeField(
+        verbose_name='Создана',
+        auto_now_add=True,
+    )
+    updated = models.DateTimeField(
+        verbose_name='Изменена',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['status', 'run_after'],
+                         name='job_status_run_after'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}({self.pk}) - {self.status}'
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from .models import Job
+
+registry = {}
+
+
+def job(name):
+    """Регистрирует функцию как фоновую задачу с именем name"""
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, idempotency_key=None, user=None,
+            max_attempts=None):
+    """Ставит задачу в очередь; повтор с тем же ключом вернет ту же задачу.
+
+    Если фоновые задачи выключены (JOBS_ENABLED), задача выполняется сразу
+    и без повторов: при ошибке она помечается как FAILED.
+    """
+    if name not in registry:
+        raise KeyError(f'Неизвестная задача: {name}')
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'user': user,
+        'max_attempts': max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    }
+    if idempotency_key is None:
+        new_job = Job.objects.create(**fields)
+    else:
+        try:
+            with transaction.atomic():
+                new_job, created = Job.objects.get_or_create(
+                    idempotency_key=idempotency_key, defaults=fields)
+        except IntegrityError:
+            return Job.objects.get(idempotency_key=idempotency_key)
+        if not created:
+            return new_job
+
+    if not settings.JOBS_ENABLED:
+        from .worker import claim_job, run_job
+        if claim_job(new_job.pk):
+            run_job(new_job.pk, retry=False)
+        new_job.refresh_from_db()
+    return new_job
@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.registry import enqueue, job
+from jobs.worker import claim_job, run_job
+
+calls = []
+
+
+@job('tests.fail')
+def fail():
+    calls.append('fail')
+    raise ValueError('Ошибка задачи')
+
+
+@job('tests.echo')
+def echo(value):
+    calls.append(value)
+    return {'value': value}
+
+
+@job('tests.reclaimed')
+def reclaimed(pk):
+    """Пока задача выполняется, ее забирает другой обработчик"""
+    Job.objects.filter(pk=pk).update(attempts=F('attempts') + 1)
+    return {}
+
+
+class WorkerTests(TestCase):
+    """Аренда, повторы и исчерпание попыток фоновых задач"""
+
+    def setUp(self):
+        calls.clear()
+
+    def create_job(self, name='tests.echo', **fields):
+        fields.setdefault('payload', {'value': 1})
+        return Job.objects.create(name=name, **fields)
+
+    def test_claim_sets_lease(self):
+        created = self.create_job()
+        self.assertEqual(claim_job(), created.pk)
+        created.refresh_from_db()
+        self.assertEqual(created.status, Job.RUNNING)
+        self.assertEqual(created.attempts, 1)
+        self.assertGreater(created.locked_until, timezone.now())
+        self.assertIsNone(claim_job())
+
+    def test_expired_lease_reclaimed(self):
+        expired = self.create_job(
+            status=Job.RUNNING, attempts=1,
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.create_job(
+            status=Job.RUNNING, attempts=1,
+            locked_until=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(claim_job(), expired.pk)
+        self.assertIsNone(claim_job())
+        expired.refresh_from_db()
+        self.assertEqual(expired.attempts, 2)
+
+    def test_expired_lease_without_attempts_fails(self):
+        exhausted = self.create_job(
+            status=Job.RUNNING, attempts=3, max_attempts=3,
+            locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(claim_job())
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, Job.FAILED)
+
+    def test_retry_then_fail(self):
+        failing = self.create_job('tests.fail', payload={}, max_attempts=2)
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            run_job(claim_job())
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, Job.PENDING)
+        self.assertIsNone(failing.locked_until)
+        self.assertGreater(failing.run_after, timezone.now())
+        Job.objects.filter(pk=failing.pk).update(run_after=timezone.now())
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            run_job(claim_job())
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, Job.FAILED)
+        self.assertEqual(calls, ['fail', 'fail'])
+
+    def test_stale_worker_result_ignored(self):
+        created = self.create_job('tests.reclaimed')
+        Job.objects.filter(pk=created.pk).update(payload={'pk': created.pk})
+        run_job(claim_job())
+        created.refresh_from_db()
+        self.assertEqual(created.status, Job.RUNNING)
+        self.assertIsNone(created.result)
+
+
+@override_settings(JOBS_ENABLED=False)
+class InlineJobTests(TestCase):
+    """Без обработчика задачи выполняются сразу и не повторяются"""
+
+    def test_inline_success(self):
+        created = enqueue('tests.echo', {'value': 2})
+        self.assertEqual(created.status, Job.DONE)
+        self.assertEqual(created.result, {'value': 2})
+
+    def test_inline_failure(self):
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            created = enqueue('tests.fail')
+        self.assertEqual(created.status, Job.FAILED)
+        self.assertEqual(created.attempts, 1)
+        self.assertIn('Ошибка задачи', created.error)
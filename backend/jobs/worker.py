@@ -0,0 +1,138 @@
+import logging
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .registry import registry
+
+logger = logging.getLogger(__name__)
+
+LEASE_EXPIRED = 'Истек срок аренды задачи, попытки исчерпаны'
+
+
+def get_lease_end():
+    return timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+
+
+def claim_job(pk=None):
+    """Помечает одну готовую к запуску задачу как выполняемую.
+
+    Задача берется в аренду на JOBS_LEASE_SECONDS. Выполняемые задачи с
+    истекшей арендой (обработчик упал или завис) забираются повторно,
+    а исчерпавшие попытки помечаются ошибкой. Возвращает ключ задачи или
+    None, если забирать нечего.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        expired = Q(status=Job.RUNNING, locked_until__lt=now)
+        Job.objects.filter(
+            expired, attempts__gte=F('max_attempts')
+        ).update(status=Job.FAILED, error=LEASE_EXPIRED)
+        jobs = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.PENDING, run_after__lte=now) | expired)
+        if pk is not None:
+            jobs = jobs.filter(pk=pk)
+        claimed = jobs.order_by('run_after', 'pk').values_list(
+            'pk', flat=True).first()
+        if claimed is None:
+            return None
+        Job.objects.filter(pk=claimed).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1,
+            locked_until=get_lease_end())
+    return claimed
+
+
+def extend_leases(pks):
+    """Продлевает аренду выполняемых задач pks"""
+    if pks:
+        Job.objects.filter(pk__in=pks, status=Job.RUNNING).update(
+            locked_until=get_lease_end())
+
+
+def run_job(pk, retry=True):
+    """Выполняет задачу pk и сохраняет результат или планирует повтор.
+
+    С retry=False (задача выполняется сразу в запросе) ошибка сразу
+    помечает задачу как FAILED. Результат записывается, только если
+    задачу за это время не забрал другой обработчик.
+    """
+    current = Job.objects.get(pk=pk)
+    claimed = Job.objects.filter(
+        pk=pk, status=Job.RUNNING, attempts=current.attempts)
+    try:
+        result = registry[current.name](**current.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning(
+            'Задача %s завершилась ошибкой', current, exc_info=True)
+        if retry and current.attempts < current.max_attempts:
+            claimed.update(
+                status=Job.PENDING,
+                error=error,
+                locked_until=None,
+                run_after=timezone.now() + timedelta(
+                    seconds=2 ** current.attempts),
+            )
+        else:
+            claimed.update(
+                status=Job.FAILED, error=error, locked_until=None)
+        return
+    claimed.update(
+        status=Job.DONE, result=result, error='', locked_until=None)
+
+
+def run_claimed_job(pk):
+    """Выполняет задачу в потоке или процессе обработчика"""
+    close_old_connections()
+    try:
+        run_job(pk)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """Забирает задачи из базы и выполняет их в пуле потоков или процессов"""
+
+    def __init__(self, workers, mode='thread', poll_interval=1.0):
+        self.workers = workers
+        self.mode = mode
+        self.poll_interval = poll_interval
+
+    def _make_executor(self):
+        if self.mode == 'process':
+            connections.close_all()
+            return ProcessPoolExecutor(
+                max_workers=self.workers, initializer=django.setup)
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def run(self, once=False):
+        with self._make_executor() as executor:
+            running = {}
+            heartbeat = time.monotonic()
+            while True:
+                running = {
+                    future: pk for future, pk in running.items()
+                    if not future.done()
+                }
+                if (time.monotonic() - heartbeat
+                        > settings.JOBS_LEASE_SECONDS / 3):
+                    extend_leases(list(running.values()))
+                    heartbeat = time.monotonic()
+                claimed = None
+                if len(running) < self.workers:
+                    claimed = claim_job()
+                if claimed is not None:
+                    future = executor.submit(run_claimed_job, claimed)
+                    running[future] = claimed
+                    continue
+                if once and not running:
+                    return
+                time.sleep(self.poll_interval)
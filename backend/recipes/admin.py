@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from .models import (
     Tag, Ingredient, Recipe,
-    RecipeIngredient, Follow, ShoppingCart, Favorite
+    RecipeIngredient, Follow, ShoppingCart, Favorite, UnitConversion
     )
 
 
@@ -20,8 +20,9 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ['author', 'name', 'tags']
 
     def get_favorites(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
     get_favorites.short_description = 'Добавили в избранное'
+    get_favorites.admin_order_field = 'favorites_count'
 
 
 @admin.register(Ingredient)
@@ -31,6 +32,11 @@ class IngredientAdmin(admin.ModelAdmin):
     list_filter = ['name']
 
 
+@admin.register(UnitConversion)
+class UnitConversionAdmin(admin.ModelAdmin):
+    list_display = ['unit', 'factor', 'canonical_unit']
+
+
 admin.site.register(Tag)
 admin.site.register(RecipeIngredient)
 admin.site.register(Follow)
@@ -0,0 +1,85 @@
+from users.models import FoodgramUser
+from .cart_totals import add_recipes_to_cart_totals
+from .counters import change_counters
+from .feed import add_authors_to_feed, remove_authors_from_feed
+from .locks import lock_recipes, lock_users
+from .memberships import KINDS
+from .models import Recipe
+
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+ABSENT = 'absent'
+NOT_FOUND = 'not_found'
+
+TARGETS = {
+    'favorites': (Recipe, 'favorites_count'),
+    'cart': (Recipe, 'carts_count'),
+    'follows': (FoodgramUser, 'followers_count'),
+}
+
+
+def lock_user(user):
+    """Блокирует строку пользователя до конца транзакции.
+
+    Все изменения избранного, корзины и подписок пользователя, по одному
+    id или пачкой, проходят под этой блокировкой и не пересекаются.
+    Рецепты, если нужны, блокируются раньше (см. recipes.locks).
+    """
+    lock_users([user.pk])
+
+
+def change_memberships(user, kind, ids, add=True):
+    """Добавляет (add=True) или удаляет пачку связей kind пользователя.
+
+    Вызывается внутри транзакции. Строка пользователя блокируется, чтобы
+    параллельные запросы не посчитали одну связь дважды. Возвращает
+    {id: статус} в порядке ids.
+    """
+    model, field = KINDS[kind]
+    target, counter = TARGETS[kind]
+    ids = list(dict.fromkeys(ids))
+    if target is Recipe:
+        found = lock_recipes(ids)
+        lock_user(user)
+    else:
+        lock_user(user)
+        found = set(target.objects.filter(
+            pk__in=ids).values_list('pk', flat=True))
+    existing = model.objects.filter(user=user, **{f'{field}__in': found})
+    servings = {}
+    if kind == 'cart':
+        servings = dict(existing.values_list(field, 'servings'))
+        existing = set(servings)
+    else:
+        existing = set(existing.values_list(field, flat=True))
+    sign = 1 if add else -1
+
+    if add:
+        changed = [pk for pk in ids if pk in found - existing]
+        model.objects.bulk_create(
+            [model(user=user, **{field: pk}) for pk in changed],
+            ignore_conflicts=True)
+        statuses = (CREATED, EXISTS)
+    else:
+        changed = [pk for pk in ids if pk in existing]
+        if changed:
+            model.objects.filter(
+                user=user, **{f'{field}__in': changed}).delete()
+        statuses = (DELETED, ABSENT)
+    change_counters(target, changed, counter, sign)
+    if kind == 'cart':
+        add_recipes_to_cart_totals(user, {
+            pk: sign * servings.get(pk, 1) for pk in changed})
+    elif kind == 'follows' and changed:
+        if add:
+            add_authors_to_feed(user.pk, changed)
+        else:
+            remove_authors_from_feed(user.pk, changed)
+
+    changed = set(changed)
+    return {
+        pk: (NOT_FOUND if pk not in found
+             else statuses[0] if pk in changed else statuses[1])
+        for pk in ids
+    }
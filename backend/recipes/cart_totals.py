@@ -0,0 +1,139 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .locks import lock_users
+from .models import RecipeIngredient, ShoppingCart, ShoppingCartTotal
+
+BATCH_SIZE = 1000
+
+
+def get_recipe_amounts(recipe):
+    """Количества ингредиентов рецепта в виде {ingredient_id: amount}"""
+    return dict(RecipeIngredient.objects.filter(
+        recipe=recipe).values_list('ingredient_id', 'amount'))
+
+
+def apply_cart_delta(user_ids, delta):
+    """Прибавляет delta {ingredient_id: amount} к итогам корзин user_ids.
+
+    Вызывается внутри транзакции вместе с изменением корзины или рецепта.
+    Строки пользователей блокируются по порядку pk: иначе две транзакции
+    могут одновременно вставить итог по новому ингредиенту и упасть на
+    уникальности пары пользователь-ингредиент.
+    """
+    user_ids = list(user_ids)
+    lock_users(user_ids)
+    change_totals(user_ids, delta)
+
+
+def change_totals(user_ids, delta):
+    """То же без блокировки: пользователи user_ids уже заблокированы"""
+    delta = {
+        ingredient_id: amount
+        for ingredient_id, amount in delta.items() if amount
+    }
+    if not delta or not user_ids:
+        return
+
+    totals = {
+        (total.user_id, total.ingredient_id): total
+        for total in ShoppingCartTotal.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=delta)
+    }
+    to_create, to_update, to_delete = [], [], []
+    for user_id in user_ids:
+        for ingredient_id, amount in delta.items():
+            total = totals.get((user_id, ingredient_id))
+            if total is None:
+                if amount > 0:
+                    to_create.append(ShoppingCartTotal(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    ))
+                continue
+            total.amount += amount
+            if total.amount > 0:
+                to_update.append(total)
+            else:
+                to_delete.append(total.pk)
+
+    ShoppingCartTotal.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    ShoppingCartTotal.objects.bulk_update(
+        to_update, ['amount'], batch_size=BATCH_SIZE)
+    ShoppingCartTotal.objects.filter(pk__in=to_delete).delete()
+
+
+def add_to_cart_totals(user, recipe, servings=1):
+    """Учитывает добавление (servings > 0) или удаление (servings < 0)
+    порций рецепта"""
+    apply_cart_delta([user.pk], {
+        ingredient_id: servings * amount
+        for ingredient_id, amount in get_recipe_amounts(recipe).items()
+    })
+
+
+def add_recipes_to_cart_totals(user, servings):
+    """То же для нескольких рецептов {recipe_id: порций}: их количества
+    суммируются заранее"""
+    if not servings:
+        return
+    delta = defaultdict(int)
+    for recipe_id, ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=list(servings)
+    ).values_list('recipe_id', 'ingredient_id', 'amount'):
+        delta[ingredient_id] += servings[recipe_id] * amount
+    apply_cart_delta([user.pk], delta)
+
+
+def update_recipe_in_cart_totals(recipe, old_amounts, new_amounts,
+                                 lock_user_ids=()):
+    """Переносит изменение ингредиентов рецепта в корзины с этим рецептом.
+
+    Строка рецепта уже заблокирована вызывающим кодом, поэтому новые
+    корзины с рецептом не появятся до коммита. Все их владельцы и
+    пользователи lock_user_ids блокируются разом по порядку pk, а не по
+    группам порций.
+    """
+    delta = {
+        ingredient_id: (new_amounts.get(ingredient_id, 0)
+                        - old_amounts.get(ingredient_id, 0))
+        for ingredient_id in set(old_amounts) | set(new_amounts)
+    }
+    carts = list(ShoppingCart.objects.filter(
+        recipe=recipe).values_list('user_id', 'servings'))
+    lock_users([user_id for user_id, _ in carts] + list(lock_user_ids))
+    users = defaultdict(list)
+    for user_id, servings in carts:
+        users[servings].append(user_id)
+    for servings, user_ids in users.items():
+        change_totals(user_ids, {
+            ingredient_id: servings * amount
+            for ingredient_id, amount in delta.items()
+        })
+
+
+def calculate_cart_totals():
+    """Итоги всех корзин, посчитанные заново из ShoppingCart"""
+    return RecipeIngredient.objects.filter(
+        recipe__shopping_cart__isnull=False
+    ).values_list(
+        'recipe__shopping_cart__user', 'ingredient'
+    ).annotate(
+        total=Sum(F('amount') * F('recipe__shopping_cart__servings'))
+    ).order_by().iterator()
+
+
+@transaction.atomic
+def rebuild_cart_totals():
+    ShoppingCartTotal.objects.all().delete()
+    batch = []
+    for user_id, ingredient_id, amount in calculate_cart_totals():
+        batch.append(ShoppingCartTotal(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount))
+        if len(batch) >= BATCH_SIZE:
+            ShoppingCartTotal.objects.bulk_create(batch)
+            batch = []
+    ShoppingCartTotal.objects.bulk_create(batch)
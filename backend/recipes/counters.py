@@ -0,0 +1,39 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import FoodgramUser
+from .models import Favorite, Follow, Recipe, ShoppingCart
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет счетчик field у объекта model с ключом pk"""
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def change_counters(model, pks, field, delta):
+    """То же для нескольких объектов одним UPDATE"""
+    if pks:
+        model.objects.filter(pk__in=pks).update(
+            **{field: F(field) + delta})
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile_counters():
+    """Пересчитывает все денормализованные счетчики из исходных таблиц"""
+    Recipe.objects.update(
+        favorites_count=count_subquery(Favorite, 'recipe'),
+        carts_count=count_subquery(ShoppingCart, 'recipe'),
+    )
+    FoodgramUser.objects.update(
+        recipes_count=count_subquery(Recipe, 'author'),
+        followers_count=count_subquery(Follow, 'author'),
+    )
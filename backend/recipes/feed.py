@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from jobs.registry import enqueue
+from users.models import FoodgramUser
+from .models import FeedEntry, Follow, Recipe
+
+TRIM_SQL = '''
+    DELETE FROM {table} WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY recipe_id DESC
+            ) AS position
+            FROM {table}
+            WHERE user_id IN ({users})
+        ) AS ranked
+        WHERE position > %s
+    )
+'''
+
+
+def trim_feeds(user_ids):
+    """Оставляет в лентах user_ids только FEED_LENGTH новых рецептов"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            TRIM_SQL.format(
+                table=connection.ops.quote_name(FeedEntry._meta.db_table),
+                users=', '.join(['%s'] * len(user_ids))),
+            [*user_ids, settings.FEED_LENGTH])
+
+
+def push_to_feeds(recipe_ids, user_ids):
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, recipe_id=recipe_id)
+         for user_id in user_ids for recipe_id in recipe_ids],
+        ignore_conflicts=True)
+    trim_feeds(user_ids)
+
+
+def push_to_followers(author_id, recipe_ids):
+    """Раскладывает рецепты по лентам всех подписчиков автора пачками"""
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).order_by('user_id').values_list('user_id', flat=True)
+    pushed, batch = 0, []
+    for user_id in followers.iterator():
+        batch.append(user_id)
+        if len(batch) >= settings.FEED_BATCH_SIZE:
+            push_to_feeds(recipe_ids, batch)
+            pushed, batch = pushed + len(batch), []
+    push_to_feeds(recipe_ids, batch)
+    return pushed + len(batch)
+
+
+def fan_out_recipe(recipe_id):
+    """Раскладывает новый рецепт по лентам подписчиков автора.
+
+    Рецепты авторов с подписчиками больше FEED_FANOUT_LIMIT не
+    раскладываются: они подмешиваются в ленту при чтении.
+    """
+    author = Recipe.objects.filter(pk=recipe_id).values(
+        'author_id', 'author__followers_count').first()
+    if (author is None or author['author__followers_count']
+            > settings.FEED_FANOUT_LIMIT):
+        return 0
+    return push_to_followers(author['author_id'], [recipe_id])
+
+
+def backfill_author_feeds(author_id):
+    """Раскладывает последние рецепты автора, опустившегося до
+    FEED_FANOUT_LIMIT подписчиков.
+
+    Пока подписчиков было больше, его рецепты подмешивались при чтении и
+    в ленты не попадали; без этого они пропали бы из лент.
+    """
+    if not FoodgramUser.objects.filter(
+            pk=author_id,
+            followers_count__lte=settings.FEED_FANOUT_LIMIT).exists():
+        return 0
+    recipe_ids = list(Recipe.objects.filter(
+        author_id=author_id
+    ).order_by('-pk').values_list('pk', flat=True)[:settings.FEED_LENGTH])
+    if not recipe_ids:
+        return 0
+    return push_to_followers(author_id, recipe_ids)
+
+
+def add_authors_to_feed(user_id, author_ids):
+    """Добавляет в ленту после подписки последние рецепты авторов"""
+    recipe_ids = list(Recipe.objects.filter(
+        author_id__in=author_ids,
+        author__followers_count__lte=settings.FEED_FANOUT_LIMIT,
+    ).order_by('-pk').values_list('pk', flat=True)[:settings.FEED_LENGTH])
+    if recipe_ids:
+        push_to_feeds(recipe_ids, [user_id])
+
+
+def remove_authors_from_feed(user_id, author_ids):
+    """Убирает рецепты авторов из ленты после отписки.
+
+    Вызывается после уменьшения счетчиков подписчиков. Авторы, у которых
+    подписчиков стало ровно FEED_FANOUT_LIMIT, только что перестали
+    подмешиваться при чтении: их рецепты раскладываются заново задачей.
+    """
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id__in=author_ids).delete()
+    crossed = list(FoodgramUser.objects.filter(
+        pk__in=author_ids, followers_count=settings.FEED_FANOUT_LIMIT
+    ).values_list('pk', flat=True))
+    for author_id in crossed:
+        transaction.on_commit(lambda author_id=author_id: enqueue(
+            'recipes.backfill_author_feeds', {'author_id': author_id}))
+
+
+def rebuild_feeds():
+    """Собирает ленты заново по текущим подпискам"""
+    FeedEntry.objects.all().delete()
+    users = Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True).distinct()
+    for user_id in users.iterator():
+        add_authors_to_feed(user_id, Follow.objects.filter(
+            user_id=user_id).values('author_id'))
+
+
+def get_feed(user):
+    """Рецепты авторов, на которых подписан user, новые первыми.
+
+    Разложенные рецепты читаются из ленты по индексу (user, recipe),
+    рецепты самых популярных авторов подмешиваются запросом.
+    """
+    return Recipe.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('recipe_id'))
+        | Q(author__in=Follow.objects.filter(
+            user=user,
+            author__followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).values('author_id'))
+    )
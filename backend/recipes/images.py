@@ -0,0 +1,87 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+IMAGE_FORMATS = {
+    'jpeg': 'JPEG',
+    'webp': 'WEBP',
+}
+
+
+def get_derivative_name(name, size, extension):
+    """Имя производного изображения рядом с оригиналом"""
+    base, _ = os.path.splitext(name)
+    return f'{base}_{size}.{extension}'
+
+
+def generate_derivatives(image):
+    """Создает уменьшенные копии изображения во всех размерах и форматах"""
+    storage = image.storage
+    with storage.open(image.name, 'rb') as original_file:
+        original = Image.open(original_file)
+        original = ImageOps.exif_transpose(original)
+        if original.mode != 'RGB':
+            background = Image.new('RGB', original.size, 'white')
+            if original.mode in ('RGBA', 'LA', 'P'):
+                original = original.convert('RGBA')
+                background.paste(original, mask=original.split()[-1])
+            else:
+                background.paste(original.convert('RGB'))
+            original = background
+
+    for size, dimensions in settings.RECIPE_IMAGE_SIZES.items():
+        resized = original.copy()
+        resized.thumbnail(dimensions, Image.LANCZOS)
+        for extension, image_format in IMAGE_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(
+                buffer,
+                image_format,
+                quality=settings.RECIPE_IMAGE_QUALITY,
+                optimize=True,
+            )
+            name = get_derivative_name(image.name, size, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def has_derivatives(image):
+    size = next(iter(settings.RECIPE_IMAGE_SIZES))
+    return image.storage.exists(
+        get_derivative_name(image.name, size, next(iter(IMAGE_FORMATS))))
+
+
+def delete_derivatives(storage, name):
+    """Удаляет все копии изображения name"""
+    for size in settings.RECIPE_IMAGE_SIZES:
+        for extension in IMAGE_FORMATS:
+            derivative = get_derivative_name(name, size, extension)
+            if storage.exists(derivative):
+                storage.delete(derivative)
+
+
+def get_derivative_urls(image, ready_name=''):
+    """Ссылки на производные изображения: {размер: {формат: url}}.
+
+    Пока копии для текущей картинки не созданы (ready_name отличается от
+    ее имени), во всех размерах отдается оригинал.
+    """
+    if not image:
+        return None
+    if ready_name != image.name:
+        return {
+            size: {extension: image.url for extension in IMAGE_FORMATS}
+            for size in settings.RECIPE_IMAGE_SIZES
+        }
+    return {
+        size: {
+            extension: image.storage.url(
+                get_derivative_name(image.name, size, extension))
+            for extension in IMAGE_FORMATS
+        }
+        for size in settings.RECIPE_IMAGE_SIZES
+    }
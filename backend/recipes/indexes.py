@@ -0,0 +1,53 @@
+import threading
+from bisect import bisect_left
+
+from .models import Ingredient
+from .versions import get_version
+
+
+class IngredientPrefixIndex:
+    """Индекс ингредиентов в памяти процесса для поиска по началу названия"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._snapshot = ((), (), ())
+
+    def _build(self):
+        rows = tuple(
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for pk, name, measurement_unit in Ingredient.objects.order_by(
+                'pk').values_list('pk', 'name', 'measurement_unit')
+        )
+        by_name = tuple(sorted(
+            rows, key=lambda row: (row['name'].lower(), row['id'])))
+        keys = tuple(row['name'].lower() for row in by_name)
+        return rows, keys, by_name
+
+    def _get_snapshot(self):
+        version = get_version('ingredients')
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._snapshot = self._build()
+                    self._version = version
+        return self._snapshot
+
+    def all(self):
+        rows, _, _ = self._get_snapshot()
+        return rows
+
+    def search(self, prefix, limit=None):
+        _, keys, by_name = self._get_snapshot()
+        prefix = prefix.lower()
+        result = []
+        for position in range(bisect_left(keys, prefix), len(keys)):
+            if not keys[position].startswith(prefix):
+                break
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(by_name[position])
+        return result
+
+
+ingredient_index = IngredientPrefixIndex()
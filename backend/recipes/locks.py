@@ -0,0 +1,22 @@
+from users.models import FoodgramUser
+from .models import Recipe
+
+
+def lock_recipes(pks):
+    """Блокирует строки рецептов pks до конца транзакции.
+
+    Порядок блокировок везде один: сначала рецепты, потом пользователи,
+    и те и другие по возрастанию pk. Так изменение рецепта и корзины с
+    ним не расходятся в итогах и не ждут друг друга по кругу. Возвращает
+    множество найденных pk.
+    """
+    return set(Recipe.objects.select_for_update().filter(
+        pk__in=list(pks)).order_by('pk').values_list('pk', flat=True))
+
+
+def lock_users(pks):
+    """Блокирует строки пользователей pks по возрастанию pk"""
+    pks = list(pks)
+    if pks:
+        list(FoodgramUser.objects.select_for_update().filter(
+            pk__in=pks).order_by('pk').values_list('pk', flat=True))
@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand
+
+from recipes.images import generate_derivatives, has_derivatives
+from recipes.models import Recipe
+from recipes.tasks import mark_derivatives_ready
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий изображений существующих рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии, даже если они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        created = 0
+        recipes = Recipe.objects.exclude(image='').only('pk', 'image')
+        for recipe in recipes.iterator():
+            if not options['force'] and has_derivatives(recipe.image):
+                mark_derivatives_ready(recipe.image.name)
+                continue
+            try:
+                generate_derivatives(recipe.image)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Рецепт {recipe.pk}: {error}')
+                continue
+            mark_derivatives_ready(recipe.image.name)
+            created += 1
+        self.stdout.write(f'Созданы копии изображений рецептов: {created}')
@@ -1,21 +1,197 @@
 import csv
+import json
+import os
+from itertools import islice
 
-from django.core.management import BaseCommand
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
 from recipes.models import Ingredient
+from recipes.units import link_unit_conversions
+from recipes.versions import bump_version
+
+STAGING_TABLE = 'ingredient_staging'
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row['name'], row['measurement_unit']
+
+
+def read_json(file, chunk_size=64 * 1024):
+    """Потоковое чтение JSON-массива объектов без загрузки файла целиком"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += chunk
+        while True:
+            buffer = buffer.lstrip()
+            if not started:
+                if not buffer:
+                    break
+                if buffer[0] != '[':
+                    raise CommandError('Ожидался JSON-массив ингредиентов')
+                buffer = buffer[1:]
+                started = True
+                continue
+            buffer = buffer.lstrip(', \n\r\t')
+            if buffer.startswith(']'):
+                return
+            try:
+                row, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break
+            buffer = buffer[end:]
+            yield row['name'], row['measurement_unit']
+        if not chunk:
+            if buffer.strip():
+                raise CommandError('Некорректный JSON в конце файла')
+            return
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            row = json.loads(line)
+            yield row['name'], row['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+    'jsonl': read_jsonl,
+}
+
+
+def clean(rows):
+    for name, measurement_unit in rows:
+        name, measurement_unit = name.strip(), measurement_unit.strip()
+        if name and measurement_unit:
+            yield name, measurement_unit
+
+
+def batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class CopyStream:
+    """Файлоподобный объект для COPY, отдающий строки пачки по одной"""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ''
+
+    def _line(self, row):
+        return '\t'.join(
+            value.replace('\\', '\\\\').replace('\t', ' ').replace('\n', ' ')
+            for value in row
+        ) + '\n'
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += self._line(row)
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    readline = read
 
 
 class Command(BaseCommand):
-    help = 'Загрузка данных из ingredients.csv файлов'
+    help = 'Загрузка ингредиентов из CSV/JSON файла без дублей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=os.path.join(settings.BASE_DIR, 'ingredients.csv'),
+            help='Путь к файлу, по умолчанию ingredients.csv проекта',
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла, по умолчанию по расширению',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.INGREDIENTS_BATCH_SIZE,
+            help='Количество строк в одной пачке',
+        )
+
+    def _load_postgresql(self, rows, batch_size):
+        table = Ingredient._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE {STAGING_TABLE} '
+                f'(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            for batch in batches(rows, batch_size):
+                cursor.copy_expert(
+                    f'COPY {STAGING_TABLE} (name, measurement_unit) '
+                    f'FROM STDIN',
+                    CopyStream(batch),
+                )
+                yield len(batch)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'SELECT DISTINCT name, measurement_unit '
+                f'FROM {STAGING_TABLE} '
+                f'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
 
-    def _load_ingredients(self):
-        with open('ingredients.csv', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            object_list = []
-            for row in reader:
-                object_list.append(Ingredient(**row))
-            Ingredient.objects.bulk_create(objs=object_list)
-        self.stdout.write('Игредиенты из ingredients.csv загружены!')
+    def _load_default(self, rows, batch_size):
+        for batch in batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in batch],
+                ignore_conflicts=True,
+            )
+            yield len(batch)
 
     def handle(self, *args, **options):
-        self._load_ingredients()
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(
+            path)[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(
+                f'Неизвестный формат файла {path}, укажите --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше ноля')
+
+        load = self._load_default
+        if connection.vendor == 'postgresql':
+            load = self._load_postgresql
+
+        before = Ingredient.objects.count()
+        processed = 0
+        try:
+            with open(path, encoding='utf-8') as file:
+                rows = clean(READERS[file_format](file))
+                for loaded in load(rows, options['batch_size']):
+                    processed += loaded
+                    self.stdout.write(f'Обработано строк: {processed}')
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Некорректная строка в {path}: {error}')
+        link_unit_conversions(
+            Ingredient.objects.filter(unit_conversion__isnull=True))
+        bump_version('ingredients')
+
+        added = Ingredient.objects.count() - before
+        self.stdout.write(
+            f'Игредиенты из {path} загружены! Новых: {added}, '
+            f'уже были: {processed - added}')
@@ -0,0 +1,47 @@
+from django.core.management import BaseCommand, CommandError
+
+from recipes.cart_totals import calculate_cart_totals, rebuild_cart_totals
+from recipes.models import ShoppingCartTotal
+
+
+class Command(BaseCommand):
+    help = 'Пересчет итогов корзин покупок из ShoppingCart'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сверить итоги, не изменяя их',
+        )
+
+    def _verify(self):
+        expected = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in calculate_cart_totals()
+        }
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in
+            ShoppingCartTotal.objects.values_list(
+                'user_id', 'ingredient_id', 'amount').iterator()
+        }
+        mismatches = 0
+        for key in expected.keys() | stored.keys():
+            if expected.get(key) != stored.get(key):
+                mismatches += 1
+                user_id, ingredient_id = key
+                self.stdout.write(
+                    f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                    f'ожидалось {expected.get(key)}, '
+                    f'сохранено {stored.get(key)}'
+                )
+        if mismatches:
+            raise CommandError(f'Расхождений в итогах корзин: {mismatches}')
+        self.stdout.write('Итоги корзин совпадают!')
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self._verify()
+            return
+        rebuild_cart_totals()
+        self.stdout.write('Итоги корзин пересчитаны!')
@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчет счетчиков избранного, корзин, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        reconcile_counters()
+        self.stdout.write('Счетчики пересчитаны!')
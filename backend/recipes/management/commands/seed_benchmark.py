@@ -0,0 +1,232 @@
+import os
+import random
+from io import BytesIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.cart_totals import rebuild_cart_totals
+from recipes.counters import reconcile_counters
+from recipes.feed import rebuild_feeds
+from recipes.management.commands.load_ingredients_csv import clean, read_csv
+from recipes.models import (
+    Favorite, Follow, Ingredient, Recipe, RecipeIngredient, ShoppingCart, Tag
+    )
+from recipes.search import rebuild_search_index
+from recipes.tag_masks import update_tags_masks
+from recipes.versions import bump_version
+from users.models import FoodgramUser
+
+EMAIL_DOMAIN = 'benchmark.local'
+PASSWORD = 'benchmark-password'
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+WORDS = (
+    'домашний', 'быстрый', 'пряный', 'сырный', 'летний', 'густой',
+    'суп', 'салат', 'пирог', 'рагу', 'омлет', 'соус', 'каша', 'плов',
+)
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса: элемент с номером k популярнее в k^s раз"""
+    return list(accumulate(1 / (rank + 1) ** exponent
+                           for rank in range(count)))
+
+
+def sample_unique(rng, population, cum_weights, count, exclude=None):
+    """До count разных элементов population с учетом весов"""
+    chosen = set()
+    for item in rng.choices(population, cum_weights=cum_weights,
+                            k=count * 2):
+        if item != exclude:
+            chosen.add(item)
+            if len(chosen) == count:
+                break
+    return sorted(chosen)
+
+
+class Command(BaseCommand):
+    help = ('Детерминированный набор пользователей, рецептов, подписок, '
+            'избранного и корзин для нагрузочных замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Подписок на пользователя в среднем')
+        parser.add_argument('--favorites', type=int, default=30,
+                            help='Избранного на пользователя в среднем')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Рецептов в корзине пользователя в среднем')
+        parser.add_argument('--ingredients', type=int, default=8,
+                            help='Ингредиентов в рецепте в среднем')
+        parser.add_argument('--images', type=int, default=20,
+                            help='Сколько разных картинок раздать рецептам')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Показатель Ципфа для популярности')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true',
+                            help='Удалить ранее созданные данные замеров')
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def get_ingredients(self):
+        path = os.path.join(settings.BASE_DIR, 'ingredients.csv')
+        with open(path, encoding='utf-8') as file:
+            rows = list(clean(read_csv(file)))
+        if Ingredient.objects.count() < len(rows):
+            call_command('load_ingredients_csv', path, stdout=self.stdout)
+        ids = {
+            (name, measurement_unit): pk
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'pk', 'name', 'measurement_unit')
+        }
+        return [ids[row] for row in rows if row in ids]
+
+    def get_tags(self):
+        for name, color, slug in DEFAULT_TAGS:
+            if not Tag.objects.filter(slug=slug).exists():
+                Tag.objects.create(name=name, color=color, slug=slug)
+        return list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+
+    def create_images(self, rng, count):
+        names = []
+        for number in range(count):
+            color = tuple(rng.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', (800, 600), color).save(buffer, 'JPEG')
+            name = f'recipes/benchmark-{number}.jpg'
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            names.append(default_storage.save(
+                name, ContentFile(buffer.getvalue())))
+        return names
+
+    def create_users(self, count, batch_size):
+        password = make_password(PASSWORD)
+        FoodgramUser.objects.bulk_create([
+            FoodgramUser(
+                email=f'bench{number}@{EMAIL_DOMAIN}',
+                username=f'bench{number}',
+                first_name='Пользователь',
+                last_name=str(number),
+                password=password,
+            )
+            for number in range(count)
+        ], batch_size=batch_size)
+        users = list(FoodgramUser.objects.filter(
+            email__endswith=f'@{EMAIL_DOMAIN}'
+        ).order_by('pk').values_list('pk', flat=True))
+        Token.objects.bulk_create(
+            [Token(user_id=user, key=Token.generate_key()) for user in users],
+            batch_size=batch_size)
+        return users
+
+    def create_recipes(self, rng, options, users, images):
+        author_weights = zipf_weights(len(users), options['skew'])
+        Recipe.objects.bulk_create([
+            Recipe(
+                author_id=rng.choices(users, cum_weights=author_weights)[0],
+                name=(f'{rng.choice(WORDS).capitalize()} '
+                      f'{rng.choice(WORDS)} #{number}'),
+                text=' '.join(rng.choices(WORDS, k=rng.randint(10, 60))),
+                cooking_time=rng.randint(5, 180),
+                image=images[number % len(images)] if images else '',
+            )
+            for number in range(options['recipes'])
+        ], batch_size=options['batch_size'])
+        return list(Recipe.objects.filter(
+            author__email__endswith=f'@{EMAIL_DOMAIN}'
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def create_recipe_rows(self, rng, options, recipes, ingredients, tags):
+        ingredient_weights = zipf_weights(len(ingredients), options['skew'])
+        recipe_ingredients, recipe_tags = [], []
+        for recipe in recipes:
+            count = max(1, int(rng.gauss(options['ingredients'], 2)))
+            for ingredient in sample_unique(
+                    rng, ingredients, ingredient_weights, count):
+                recipe_ingredients.append(RecipeIngredient(
+                    recipe_id=recipe, ingredient_id=ingredient,
+                    amount=rng.choice((1, 2, 5, 10, 50, 100, 200, 500))))
+            for tag in rng.sample(tags, rng.randint(1, len(tags))):
+                recipe_tags.append(
+                    Recipe.tags.through(recipe_id=recipe, tag_id=tag))
+        RecipeIngredient.objects.bulk_create(
+            recipe_ingredients, batch_size=options['batch_size'])
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, batch_size=options['batch_size'])
+        return len(recipe_ingredients)
+
+    def create_memberships(self, rng, options, users, recipes):
+        """Подписки, избранное и корзины с перекосом к популярным"""
+        user_weights = zipf_weights(len(users), options['skew'])
+        recipe_weights = zipf_weights(len(recipes), options['skew'])
+        follows, favorites, carts = [], [], []
+        for user in users:
+            for author in sample_unique(
+                    rng, users, user_weights,
+                    int(rng.expovariate(1 / options['follows'])),
+                    exclude=user):
+                follows.append(Follow(user_id=user, author_id=author))
+            for recipe in sample_unique(
+                    rng, recipes, recipe_weights,
+                    int(rng.expovariate(1 / options['favorites']))):
+                favorites.append(Favorite(user_id=user, recipe_id=recipe))
+            for recipe in sample_unique(
+                    rng, recipes, recipe_weights,
+                    int(rng.expovariate(1 / options['carts']))):
+                carts.append(ShoppingCart(user_id=user, recipe_id=recipe))
+        for model, objects in ((Follow, follows), (Favorite, favorites),
+                               (ShoppingCart, carts)):
+            model.objects.bulk_create(
+                objects, batch_size=options['batch_size'])
+        return len(follows), len(favorites), len(carts)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 рецепт')
+        existing = FoodgramUser.objects.filter(
+            email__endswith=f'@{EMAIL_DOMAIN}')
+        if existing.exists():
+            if not options['clear']:
+                raise CommandError(
+                    'Данные замеров уже есть, запустите с --clear')
+            existing.delete()
+
+        rng = random.Random(options['seed'])
+        ingredients = self.get_ingredients()
+        tags = self.get_tags()
+        images = self.create_images(rng, options['images'])
+        with transaction.atomic():
+            users = self.create_users(options['users'], options['batch_size'])
+            self.log(f'Пользователей: {len(users)}')
+            recipes = self.create_recipes(rng, options, users, images)
+            self.log(f'Рецептов: {len(recipes)}')
+            rows = self.create_recipe_rows(
+                rng, options, recipes, ingredients, tags)
+            self.log(f'Ингредиентов в рецептах: {rows}')
+            follows, favorites, carts = self.create_memberships(
+                rng, options, users, recipes)
+            self.log(f'Подписок: {follows}, в избранном: {favorites}, '
+                     f'в корзинах: {carts}')
+            reconcile_counters()
+            rebuild_cart_totals()
+            rebuild_search_index(recipes)
+            update_tags_masks(recipes)
+            rebuild_feeds()
+        bump_version('recipes')
+        self.log(f'Данные для замеров созданы! Пароль пользователей: '
+                 f'{PASSWORD}')
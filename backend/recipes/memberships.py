@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Favorite, Follow, ShoppingCart
+from .versions import get_counters, increment_counters
+
+MEMBERSHIP_KEY = 'memberships:{}:{}:{}'
+MEMBERSHIP_VERSION_KEY = 'memberships_version:{}:{}'
+KINDS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'cart': (ShoppingCart, 'recipe_id'),
+    'follows': (Follow, 'author_id'),
+}
+
+
+class Memberships:
+    """Множества id избранного, корзины и подписок пользователя"""
+
+    def __init__(self, user):
+        self.user = user
+        self._sets = {}
+
+    def get(self, kind):
+        if kind not in self._sets:
+            self._sets[kind] = self._load(kind)
+        return self._sets[kind]
+
+    def _load(self, kind):
+        if not self.user.is_authenticated:
+            return frozenset()
+        key = get_membership_key(self.user.pk, kind)
+        ids = cache.get(key)
+        if ids is None:
+            model, field = KINDS[kind]
+            ids = frozenset(model.objects.filter(
+                user=self.user).values_list(field, flat=True))
+            cache.set(key, ids, settings.MEMBERSHIP_CACHE_TIMEOUT)
+        return ids
+
+    def update(self, kind, added=(), removed=()):
+        if kind in self._sets:
+            self._sets[kind] = (self._sets[kind] | added) - removed
+
+    @property
+    def favorites(self):
+        return self.get('favorites')
+
+    @property
+    def cart(self):
+        return self.get('cart')
+
+    @property
+    def follows(self):
+        return self.get('follows')
+
+
+def get_membership_key(user_id, kind):
+    """Ключ множества kind с текущей версией.
+
+    Версия читается до запроса к базе: если запись закоммитится после
+    чтения, множество ляжет под старую версию и больше не прочитается.
+    """
+    version_key = MEMBERSHIP_VERSION_KEY.format(user_id, kind)
+    version = get_counters([version_key])[version_key]
+    return MEMBERSHIP_KEY.format(user_id, kind, version)
+
+
+def get_memberships(request):
+    """Множества пользователя запроса, загруженные не больше раза за запрос"""
+    memberships = getattr(request, '_memberships', None)
+    if memberships is None:
+        memberships = Memberships(request.user)
+        request._memberships = memberships
+    return memberships
+
+
+def update_memberships(request, kind, added=(), removed=()):
+    """Добавляет и убирает id в множестве kind пользователя.
+
+    В кэше после коммита увеличивается версия множества: это атомарно, в
+    отличие от дописывания, и старое множество больше не читается.
+    """
+    added, removed = frozenset(added), frozenset(removed)
+    if not added and not removed:
+        return
+    memberships = getattr(request, '_memberships', None)
+    if memberships is not None:
+        memberships.update(kind, added, removed)
+    key = MEMBERSHIP_VERSION_KEY.format(request.user.pk, kind)
+    transaction.on_commit(lambda: increment_counters([key]))
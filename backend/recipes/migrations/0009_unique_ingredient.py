@@ -0,0 +1,50 @@
+# Generated by Django 3.2 on 2026-10-18 18:14
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartTotal = apps.get_model('recipes', 'ShoppingCartTotal')
+    # order_by() убирает pk из GROUP BY, иначе дубли не попадут в одну группу
+    duplicates = Ingredient.objects.order_by().values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('pk'), total=Count('pk')).filter(total__gt=1)
+
+    for duplicate in duplicates:
+        keep = duplicate['keep']
+        others = Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(pk=keep)
+        for model, owner in ((RecipeIngredient, 'recipe'),
+                             (ShoppingCartTotal, 'user')):
+            for row in model.objects.filter(ingredient__in=others):
+                merged = model.objects.filter(
+                    ingredient_id=keep,
+                    **{f'{owner}_id': getattr(row, f'{owner}_id')}
+                ).update(amount=F('amount') + row.amount)
+                if merged:
+                    row.delete()
+                else:
+                    row.ingredient_id = keep
+                    row.save(update_fields=['ingredient'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_name_measurement_unit'),
+        ),
+    ]
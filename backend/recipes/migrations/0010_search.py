@@ -0,0 +1,72 @@
+# Generated by Django 3.2 on 2026-10-18 18:22
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+# SQL скопирован из recipes.search: миграция не должна зависеть от
+# текущего кода приложения.
+FTS_TABLE = 'recipes_recipe_fts'
+GIN_INDEX = 'recipes_recipe_search_vector_gin'
+DOCUMENT_SQL = '''
+    SELECT recipe.id, recipe.name, COALESCE((
+        SELECT {agg}
+        FROM recipes_recipeingredient recipe_ingredient
+        JOIN recipes_ingredient ingredient
+            ON ingredient.id = recipe_ingredient.ingredient_id
+        WHERE recipe_ingredient.recipe_id = recipe.id
+    ), '') AS ingredients, recipe.text
+    FROM recipes_recipe recipe
+'''
+UPDATE_VECTOR_SQL = '''
+    UPDATE recipes_recipe SET search_vector =
+        setweight(to_tsvector(%(config)s, document.name), 'A')
+        || setweight(to_tsvector(%(config)s, document.ingredients), 'B')
+        || setweight(to_tsvector(%(config)s, document.text), 'C')
+    FROM ({document}) document
+    WHERE recipes_recipe.id = document.id
+'''.format(document=DOCUMENT_SQL.format(
+    agg="string_agg(ingredient.name, ' ')"))
+INSERT_FTS_SQL = '''
+    INSERT INTO {table} (rowid, name, ingredients, text) {document}
+'''.format(table=FTS_TABLE, document=DOCUMENT_SQL.format(
+    agg="group_concat(ingredient.name, ' ')"))
+
+
+def fill_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {GIN_INDEX} ON recipes_recipe '
+            f'USING gin (search_vector)')
+        schema_editor.execute(
+            UPDATE_VECTOR_SQL, {'config': settings.SEARCH_CONFIG})
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} '
+            f'USING fts5(name, ingredients, text)')
+        schema_editor.execute(INSERT_FTS_SQL)
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {GIN_INDEX}')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(fill_search_index, remove_search_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-18 18:29
+
+from django.db import migrations, models
+
+# Копия recipes.tag_masks.get_tags_mask на момент создания миграции
+MASK_BITS = 63
+
+
+def get_tags_mask(tag_ids):
+    mask = 0
+    for tag_id in tag_ids:
+        if 0 < tag_id <= MASK_BITS:
+            mask |= 1 << (tag_id - 1)
+    return mask
+
+
+def fill_tags_masks(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    tag_ids = {}
+    for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id'):
+        tag_ids.setdefault(recipe_id, []).append(tag_id)
+    Recipe.objects.bulk_update(
+        [Recipe(pk=recipe_id, tags_mask=get_tags_mask(ids))
+         for recipe_id, ids in tag_ids.items()],
+        ['tags_mask'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False, verbose_name='Битовая маска тегов'),
+        ),
+        migrations.RunPython(fill_tags_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2 on 2026-10-18 18:42
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery
+
+UNIT_CONVERSIONS = (
+    ('кг', 'г', 1000),
+    ('л', 'мл', 1000),
+)
+
+
+def fill_unit_conversions(apps, schema_editor):
+    UnitConversion = apps.get_model('recipes', 'UnitConversion')
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    UnitConversion.objects.bulk_create([
+        UnitConversion(unit=unit, canonical_unit=canonical_unit,
+                       factor=factor)
+        for unit, canonical_unit, factor in UNIT_CONVERSIONS
+    ])
+    Ingredient.objects.update(unit_conversion=Subquery(
+        UnitConversion.objects.filter(
+            unit=OuterRef('measurement_unit')).values('pk')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit', models.CharField(max_length=200, unique=True, verbose_name='Ед. изм.')),
+                ('canonical_unit', models.CharField(max_length=200, verbose_name='Базовая ед. изм.')),
+                ('factor', models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)], verbose_name='Базовых единиц в одной')),
+            ],
+            options={
+                'verbose_name': 'Перевод единиц',
+                'verbose_name_plural': 'Переводы единиц',
+                'ordering': ['unit'],
+            },
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Порций'),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='unit_conversion',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ingredients', to='recipes.unitconversion', verbose_name='Перевод в базовую единицу'),
+        ),
+        migrations.RunPython(
+            fill_unit_conversions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_unit_conversions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_name',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Картинка с готовыми копиями'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 
 from users.models import FoodgramUser
@@ -26,6 +27,30 @@ class Tag(models.Model):
         return self.name
 
 
+class UnitConversion(models.Model):
+    unit = models.CharField(
+        verbose_name='Ед. изм.',
+        max_length=settings.LENGTH_200,
+        unique=True,
+    )
+    canonical_unit = models.CharField(
+        verbose_name='Базовая ед. изм.',
+        max_length=settings.LENGTH_200,
+    )
+    factor = models.PositiveIntegerField(
+        verbose_name='Базовых единиц в одной',
+        validators=[MinValueValidator(1)],
+    )
+
+    def __str__(self):
+        return f'1 {self.unit} = {self.factor} {self.canonical_unit}'
+
+    class Meta:
+        verbose_name = 'Перевод единиц'
+        verbose_name_plural = 'Переводы единиц'
+        ordering = ['unit']
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         verbose_name='Название',
@@ -35,12 +60,26 @@ class Ingredient(models.Model):
         verbose_name='Ед. изм.',
         max_length=settings.LENGTH_200,
     )
+    unit_conversion = models.ForeignKey(
+        UnitConversion,
+        related_name='ingredients',
+        verbose_name='Перевод в базовую единицу',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+    )
 
     def __str__(self):
         return f'{self.name}'
 
     class Meta:
         ordering = ['pk']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_name_measurement_unit'),
+        ]
 
 
 class Recipe(models.Model):
@@ -83,6 +122,35 @@ class Recipe(models.Model):
                               )
         ]
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавили в избранное',
+        default=0,
+        db_index=True,
+        editable=False,
+    )
+    carts_count = models.PositiveIntegerField(
+        verbose_name='Добавили в корзину',
+        default=0,
+        db_index=True,
+        editable=False,
+    )
+    tags_mask = models.BigIntegerField(
+        verbose_name='Битовая маска тегов',
+        default=0,
+        db_index=True,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    image_variants_name = models.CharField(
+        verbose_name='Картинка с готовыми копиями',
+        max_length=100,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
         ordering = ['-pk']
@@ -165,6 +233,11 @@ class ShoppingCart(models.Model):
         verbose_name='Пользователь',
         on_delete=models.CASCADE,
     )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Порций',
+        default=1,
+        validators=[MinValueValidator(1)],
+    )
 
     def __str__(self):
         return f'Пользователь {self.user} добавил в в корзину {self.recipe}'
@@ -202,3 +275,62 @@ class Favorite(models.Model):
                 fields=['user', 'recipe'],
                 name='unique_user_recipe_favorite'),
         ]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        FoodgramUser,
+        related_name='feed',
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+    )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        ordering = ['-recipe']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_user_recipe_feed'),
+        ]
+
+
+class ShoppingCartTotal(models.Model):
+    user = models.ForeignKey(
+        FoodgramUser,
+        related_name='cart_totals',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name='cart_totals',
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+    )
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}'
+
+    class Meta:
+        verbose_name = 'Итог корзины'
+        verbose_name_plural = 'Итоги корзин'
+        ordering = ['pk']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient_cart_total'),
+        ]
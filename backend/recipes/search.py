@@ -0,0 +1,102 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+FTS_TABLE = 'recipes_recipe_fts'
+WORD_RE = re.compile(r'\w+')
+
+RECIPE_TABLE = Recipe._meta.db_table
+DOCUMENT_SQL = f'''
+    SELECT recipe.id, recipe.name, COALESCE((
+        SELECT {{agg}}
+        FROM {RecipeIngredient._meta.db_table} recipe_ingredient
+        JOIN {Ingredient._meta.db_table} ingredient
+            ON ingredient.id = recipe_ingredient.ingredient_id
+        WHERE recipe_ingredient.recipe_id = recipe.id
+    ), '') AS ingredients, recipe.text
+    FROM {RECIPE_TABLE} recipe
+'''
+UPDATE_VECTOR_SQL = f'''
+    UPDATE {RECIPE_TABLE} SET search_vector =
+        setweight(to_tsvector(%(config)s, document.name), 'A')
+        || setweight(to_tsvector(%(config)s, document.ingredients), 'B')
+        || setweight(to_tsvector(%(config)s, document.text), 'C')
+    FROM ({DOCUMENT_SQL.format(agg="string_agg(ingredient.name, ' ')")}
+          WHERE recipe.id = ANY(%(pks)s)) document
+    WHERE {RECIPE_TABLE}.id = document.id
+'''
+
+
+def get_words(value):
+    """Слова поискового запроса без операторов и спецсимволов"""
+    return WORD_RE.findall(value.lower())
+
+
+def rebuild_search_index(pks):
+    """Пересчитывает поисковые документы рецептов pks"""
+    pks = list(pks)
+    batch_size = settings.SEARCH_BATCH_SIZE
+    with connection.cursor() as cursor:
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            if connection.vendor == 'postgresql':
+                cursor.execute(UPDATE_VECTOR_SQL, {
+                    'config': settings.SEARCH_CONFIG, 'pks': batch})
+            elif connection.vendor == 'sqlite':
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(
+                    f'DELETE FROM {FTS_TABLE} '
+                    f'WHERE rowid IN ({placeholders})', batch)
+                document_sql = DOCUMENT_SQL.format(
+                    agg="group_concat(ingredient.name, ' ')")
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} '
+                    f'(rowid, name, ingredients, text) {document_sql} '
+                    f'WHERE recipe.id IN ({placeholders})', batch)
+
+
+def update_search_index(pks):
+    """Обновляет поисковый индекс рецептов после коммита транзакции"""
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: rebuild_search_index(pks))
+
+
+def search_recipes(queryset, value):
+    """Рецепты, подходящие под запрос, с релевантностью в search_rank"""
+    words = get_words(value)
+    if not words:
+        return queryset
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            ' & '.join(f'{word}:*' for word in words),
+            config=settings.SEARCH_CONFIG,
+            search_type='raw',
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query))
+    if connection.vendor == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match, )
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 4.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = {RECIPE_TABLE}.id',
+            (match, ),
+            output_field=FloatField(),
+        ))
+    condition = Q()
+    for word in words:
+        condition &= (Q(name__icontains=word) | Q(text__icontains=word)
+                      | Q(ingredients__name__icontains=word))
+    return queryset.filter(
+        pk__in=Recipe.objects.filter(condition).values('pk')
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,145 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_save
+    )
+from django.dispatch import receiver
+
+from jobs.registry import enqueue
+from users.models import FoodgramUser
+from .models import (
+    Ingredient, Recipe, RecipeIngredient, Tag, UnitConversion
+    )
+from .search import update_search_index
+from .tasks import release_derivatives
+from .tag_masks import clear_tag_bit, update_tags_masks
+from .units import get_unit_conversion, link_unit_conversions
+from .versions import bump_version, invalidate_recipes
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+SEARCH_FIELDS = {'name', 'text'}
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def ingredients_changed(sender, created=False, **kwargs):
+    bump_version('ingredients')
+    if not created:
+        bump_version('recipes')
+
+
+@receiver(pre_save, sender=Ingredient)
+def ingredient_unit_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'measurement_unit' in update_fields:
+        instance.unit_conversion = get_unit_conversion(
+            instance.measurement_unit)
+
+
+@receiver(post_save, sender=UnitConversion)
+def unit_conversion_saved(sender, instance, **kwargs):
+    link_unit_conversions(Ingredient.objects.filter(
+        Q(measurement_unit=instance.unit) | Q(unit_conversion=instance)))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created=False, update_fields=None,
+                       **kwargs):
+    if created:
+        return
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    update_search_index(RecipeIngredient.objects.filter(
+        ingredient=instance).values_list('recipe_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tags_changed(sender, **kwargs):
+    bump_version('tags')
+    bump_version('recipes')
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_image_changing(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and (update_fields is None or 'image' in update_fields):
+        instance._previous_image = Recipe.objects.filter(
+            pk=instance.pk).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_saved(sender, instance, update_fields=None, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    if previous and previous != instance.image.name:
+        transaction.on_commit(lambda: release_derivatives(previous))
+    if not instance.image:
+        return
+    if update_fields is None or 'image' in update_fields:
+        transaction.on_commit(lambda: enqueue(
+            'recipes.generate_image_derivatives',
+            {'recipe_id': instance.pk},
+            idempotency_key=f'image-derivatives:{instance.image.name}',
+        ))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created=False, **kwargs):
+    if created:
+        transaction.on_commit(lambda: enqueue(
+            'recipes.fan_out_recipe',
+            {'recipe_id': instance.pk},
+            idempotency_key=f'fan-out:{instance.pk}',
+        ))
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_text_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        update_search_index([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    update_search_index([instance.pk])
+    name = instance.image.name
+    transaction.on_commit(lambda: release_derivatives(name))
+
+
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+    update_search_index([instance.recipe_id])
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    clear_tag_bit(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set=None,
+                        **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        bump_version('recipes')
+        if action == 'post_clear':
+            clear_tag_bit(instance.pk)
+        else:
+            update_tags_masks(pk_set)
+    else:
+        invalidate_recipes([instance.pk])
+        update_tags_masks([instance.pk])
+
+
+@receiver(post_save, sender=FoodgramUser)
+def author_changed(sender, instance, created=False, update_fields=None,
+                   **kwargs):
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    invalidate_recipes(
+        Recipe.objects.filter(author=instance).values_list('pk', flat=True))
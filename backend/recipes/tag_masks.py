@@ -0,0 +1,99 @@
+from itertools import combinations
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import Recipe, Tag
+from .versions import get_version
+
+MASK_BITS = 63
+TAG_IDS_KEY = 'tag-ids:{}'
+
+
+def get_tag_bit(tag_id):
+    """Бит тега в маске; у тегов с id больше MASK_BITS бита нет"""
+    if 0 < tag_id <= MASK_BITS:
+        return 1 << (tag_id - 1)
+    return None
+
+
+def get_tags_mask(tag_ids):
+    mask = 0
+    for tag_id in tag_ids:
+        mask |= get_tag_bit(tag_id) or 0
+    return mask
+
+
+def get_tag_ids():
+    """id всех тегов, закэшированные до изменения тегов"""
+    key = TAG_IDS_KEY.format(get_version('tags'))
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = list(Tag.objects.order_by('pk').values_list(
+            'pk', flat=True))
+        cache.set(key, tag_ids, settings.REFERENCE_CACHE_TIMEOUT)
+    return tag_ids
+
+
+def update_tags_masks(recipe_ids):
+    """Пересчитывает маски рецептов по их текущим тегам"""
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    tag_ids = {recipe_id: [] for recipe_id in recipe_ids}
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids).values_list('recipe_id', 'tag_id'):
+        tag_ids[recipe_id].append(tag_id)
+    Recipe.objects.bulk_update(
+        [Recipe(pk=recipe_id, tags_mask=get_tags_mask(ids))
+         for recipe_id, ids in tag_ids.items()],
+        ['tags_mask'],
+        batch_size=settings.SEARCH_BATCH_SIZE,
+    )
+
+
+def clear_tag_bit(tag_id):
+    bit = get_tag_bit(tag_id)
+    if bit is not None:
+        Recipe.objects.alias(
+            tag_bit=F('tags_mask').bitand(bit)
+        ).filter(tag_bit__gt=0).update(tags_mask=F('tags_mask').bitand(~bit))
+
+
+def get_matching_masks(mask):
+    """Все маски из существующих тегов, пересекающиеся с mask"""
+    bits = [bit for bit in map(get_tag_bit, get_tag_ids()) if bit]
+    if len(bits) > settings.TAGS_MASK_ENUMERATION_LIMIT:
+        return None
+    masks = []
+    for size in range(1, len(bits) + 1):
+        for subset in combinations(bits, size):
+            subset_mask = sum(subset)
+            if subset_mask & mask:
+                masks.append(subset_mask)
+    return masks
+
+
+def filter_by_tags(queryset, tag_ids):
+    """Рецепты хотя бы с одним из тегов без JOIN по тегам.
+
+    Пока тегов немного, условие — tags_mask IN (...) по всем подходящим
+    маскам, которое обслуживается индексом. Теги без бита в маске
+    проверяются подзапросом.
+    """
+    mask = get_tags_mask(tag_ids)
+    condition = Q(pk__in=[])
+    if mask:
+        masks = get_matching_masks(mask)
+        if masks is None:
+            queryset = queryset.alias(
+                tag_bits=F('tags_mask').bitand(mask))
+            condition = Q(tag_bits__gt=0)
+        else:
+            condition = Q(tags_mask__in=masks)
+    unmasked = [tag_id for tag_id in tag_ids if get_tag_bit(tag_id) is None]
+    if unmasked:
+        condition |= Q(pk__in=Recipe.tags.through.objects.filter(
+            tag_id__in=unmasked).values('recipe_id'))
+    return queryset.filter(condition)
@@ -0,0 +1,40 @@
+from jobs.registry import job
+
+from .feed import backfill_author_feeds, fan_out_recipe
+from .images import delete_derivatives, generate_derivatives
+from .models import Recipe
+from .versions import invalidate_recipes
+
+
+def mark_derivatives_ready(name):
+    """Переключает рецепты с картинкой name на готовые копии"""
+    recipes = Recipe.objects.filter(image=name)
+    pks = list(recipes.values_list('pk', flat=True))
+    recipes.update(image_variants_name=name)
+    invalidate_recipes(pks)
+
+
+def release_derivatives(name):
+    """Удаляет копии картинки name, если она больше не используется"""
+    if name and not Recipe.objects.filter(image=name).exists():
+        delete_derivatives(Recipe._meta.get_field('image').storage, name)
+
+
+@job('recipes.generate_image_derivatives')
+def generate_image_derivatives(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only('pk', 'image').first()
+    if recipe is None or not recipe.image:
+        return None
+    generate_derivatives(recipe.image)
+    mark_derivatives_ready(recipe.image.name)
+    return {'image': recipe.image.name}
+
+
+@job('recipes.fan_out_recipe')
+def fan_out_recipe_job(recipe_id):
+    return {'followers': fan_out_recipe(recipe_id)}
+
+
+@job('recipes.backfill_author_feeds')
+def backfill_author_feeds_job(author_id):
+    return {'followers': backfill_author_feeds(author_id)}
@@ -0,0 +1,119 @@
+from unittest import mock
+
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_users
+from recipes import locks
+from recipes.cart_totals import calculate_cart_totals
+from recipes.counters import reconcile_counters
+from recipes.models import (
+    Ingredient, Recipe, RecipeIngredient, ShoppingCartTotal, Tag
+    )
+
+
+class CartTotalsTests(APITestCase):
+    """Итоги корзины после каждого изменения совпадают с пересчетом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author = create_users(2)
+        cls.tag = Tag.objects.create(
+            name='Обед', color='#000001', slug='lunch')
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(4)
+        ]
+        cls.recipes = []
+        for number in range(2):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}',
+                text='Описание', cooking_time=1)
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=10 * (number + 1) + index)
+                for index, ingredient in enumerate(
+                    cls.ingredients[number:number + 3])
+            ])
+            cls.recipes.append(recipe)
+        reconcile_counters()
+
+    def assertTotalsConsistent(self):
+        self.assertEqual(
+            sorted(ShoppingCartTotal.objects.values_list(
+                'user', 'ingredient', 'amount')),
+            sorted(calculate_cart_totals()))
+
+    def cart(self, method, recipe, **data):
+        self.client.force_authenticate(self.reader)
+        response = getattr(self.client, method)(
+            f'/api/recipes/{recipe.pk}/shopping_cart/', data, format='json')
+        self.assertIn(response.status_code, (201, 204))
+
+    def test_servings_and_removal(self):
+        first, second = self.recipes
+        self.cart('post', first, servings=2)
+        self.cart('post', second)
+        self.assertTotalsConsistent()
+        self.cart('post', first, servings=3)
+        self.assertTotalsConsistent()
+        self.cart('delete', first)
+        self.assertTotalsConsistent()
+        self.cart('delete', second)
+        self.assertFalse(ShoppingCartTotal.objects.exists())
+
+    def test_recipe_changes(self):
+        first, second = self.recipes
+        self.cart('post', first, servings=2)
+        self.cart('post', second)
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(f'/api/recipes/{first.pk}/', {
+            'ingredients': [
+                {'id': self.ingredients[0].pk, 'amount': 5},
+                {'id': self.ingredients[3].pk, 'amount': 7},
+            ],
+            'tags': [self.tag.pk],
+            'name': first.name,
+            'text': first.text,
+            'cooking_time': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTotalsConsistent()
+        response = self.client.delete(f'/api/recipes/{second.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertTotalsConsistent()
+
+    def test_lock_order(self):
+        """Рецепт блокируется раньше пользователей, а владельцы корзин с
+        разным числом порций — одним запросом"""
+        first, _ = self.recipes
+        self.cart('post', first)
+        self.client.force_authenticate(self.author)
+        self.client.post(f'/api/recipes/{first.pk}/shopping_cart/',
+                         {'servings': 2}, format='json')
+        calls = []
+
+        def record(name, function):
+            def wrapper(pks):
+                pks = list(pks)
+                calls.append((name, sorted(set(pks))))
+                return function(pks)
+            return wrapper
+
+        with mock.patch('api.serializers.lock_recipes',
+                        record('recipes', locks.lock_recipes)), \
+                mock.patch('recipes.cart_totals.lock_users',
+                           record('users', locks.lock_users)):
+            response = self.client.patch(f'/api/recipes/{first.pk}/', {
+                'ingredients': [{'id': self.ingredients[0].pk, 'amount': 1}],
+                'tags': [self.tag.pk],
+                'name': first.name,
+                'text': first.text,
+                'cooking_time': 1,
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(calls, [
+            ('recipes', [first.pk]),
+            ('users', sorted([self.reader.pk, self.author.pk])),
+        ])
+        self.assertTotalsConsistent()
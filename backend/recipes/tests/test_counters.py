@@ -0,0 +1,93 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_users, get_image
+from recipes.counters import reconcile_counters
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import FoodgramUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_counters():
+    return (
+        list(Recipe.objects.order_by('pk').values_list(
+            'pk', 'favorites_count', 'carts_count')),
+        list(FoodgramUser.objects.order_by('pk').values_list(
+            'pk', 'recipes_count', 'followers_count')),
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CounterTests(APITestCase):
+    """Счетчики, которые ведут маршруты API, совпадают с пересчетом"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = create_users(3)
+        cls.tag = Tag.objects.create(
+            name='Обед', color='#000001', slug='lunch')
+        cls.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def assertCountersReconciled(self):
+        counters = get_counters()
+        reconcile_counters()
+        self.assertEqual(counters, get_counters())
+
+    def create_recipe(self, author):
+        self.client.force_authenticate(author)
+        response = self.client.post('/api/recipes/', {
+            'ingredients': [{'id': self.ingredient.pk, 'amount': 1}],
+            'tags': [self.tag.pk],
+            'image': get_image(),
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_counters_follow_api(self):
+        author, reader, other = self.users
+        recipe = self.create_recipe(author)
+        for user in (reader, other):
+            self.client.force_authenticate(user)
+            for url in (f'/api/recipes/{recipe}/favorite/',
+                        f'/api/recipes/{recipe}/shopping_cart/',
+                        f'/api/users/{author.pk}/subscribe/'):
+                self.client.post(url)
+                self.client.post(url)
+        self.assertEqual(
+            Recipe.objects.get(pk=recipe).favorites_count, 2)
+        self.assertCountersReconciled()
+
+        self.client.force_authenticate(reader)
+        self.client.delete(f'/api/recipes/{recipe}/favorite/')
+        self.client.delete('/api/users/subscribe/', {'ids': [author.pk]},
+                           format='json')
+        self.assertCountersReconciled()
+
+        self.client.force_authenticate(author)
+        self.client.delete(f'/api/recipes/{recipe}/')
+        self.assertEqual(FoodgramUser.objects.get(
+            pk=author.pk).recipes_count, 0)
+        self.assertCountersReconciled()
+
+    def test_reconcile_fixes_drift(self):
+        author = self.users[0]
+        recipe = self.create_recipe(author)
+        Recipe.objects.filter(pk=recipe).update(favorites_count=5)
+        FoodgramUser.objects.filter(pk=author.pk).update(recipes_count=7)
+        reconcile_counters()
+        self.assertEqual(Recipe.objects.get(pk=recipe).favorites_count, 0)
+        self.assertEqual(
+            FoodgramUser.objects.get(pk=author.pk).recipes_count, 1)
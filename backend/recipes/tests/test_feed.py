@@ -0,0 +1,105 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_users
+from recipes.counters import reconcile_counters
+from recipes.models import FeedEntry, Recipe
+
+
+@override_settings(FEED_FANOUT_LIMIT=1, JOBS_ENABLED=False)
+class FeedThresholdTests(APITestCase):
+    """Рецепты популярного автора не пропадают из лент, когда подписчиков
+    становится меньше порога"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.other, cls.author = create_users(3)
+
+    def subscribe(self, user, method='post'):
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(
+                f'/api/users/{self.author.pk}/subscribe/')
+        self.assertIn(response.status_code, (201, 204))
+
+    def feed_ids(self):
+        self.client.force_authenticate(self.reader)
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_backfill_below_limit(self):
+        self.subscribe(self.reader)
+        self.subscribe(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author, name='Рецепт', text='Описание',
+                cooking_time=1)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_ids(), [recipe.pk])
+
+        self.subscribe(self.other, 'delete')
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'recipe')),
+            [(self.reader.pk, recipe.pk)])
+        self.assertEqual(self.feed_ids(), [recipe.pk])
+
+
+@override_settings(JOBS_ENABLED=False)
+class FeedContentsTests(APITestCase):
+    """Лента состоит из новых рецептов авторов, на которых подписан
+    пользователь"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author, cls.other = create_users(3)
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=1)
+            for number, author in enumerate(
+                (cls.author, cls.other, cls.author))
+        ]
+        reconcile_counters()
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def subscribe(self, method, authors):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(
+                '/api/users/subscribe/',
+                {'ids': [author.pk for author in authors]}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def feed_ids(self):
+        response = self.client.get('/api/recipes/feed/?limit=100')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_follow_unfollow_and_new_recipes(self):
+        first, second, third = [recipe.pk for recipe in self.recipes]
+        self.subscribe('post', [self.author, self.other])
+        self.assertEqual(self.feed_ids(), [third, second, first])
+        self.subscribe('delete', [self.author])
+        self.assertEqual(self.feed_ids(), [second])
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.other, name='Новый', text='Описание',
+                cooking_time=1)
+        self.assertEqual(self.feed_ids(), [recipe.pk, second])
+
+    @override_settings(FEED_LENGTH=2)
+    def test_feed_length(self):
+        first, second, third = [recipe.pk for recipe in self.recipes]
+        self.subscribe('post', [self.author, self.other])
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(self.feed_ids(), [third, second])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_authors_read_from_follows(self):
+        first, second, third = [recipe.pk for recipe in self.recipes]
+        self.subscribe('post', [self.author, self.other])
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_ids(), [third, second, first])
@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from foodgram.testing import create_user
+from recipes.images import get_derivative_name, get_derivative_urls
+from recipes.models import Recipe
+from recipes.tasks import generate_image_derivatives
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def get_image_file():
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name='dish.png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, JOBS_ENABLED=True)
+class ImageDerivativeTests(TestCase):
+    """Копии отдаются, только когда созданы, и удаляются вместе с
+    картинкой"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        author = create_user('author')
+        self.recipe = Recipe.objects.create(
+            author=author, name='Рецепт', text='Описание', cooking_time=1,
+            image=get_image_file())
+
+    def get_urls(self):
+        self.recipe.refresh_from_db()
+        return get_derivative_urls(
+            self.recipe.image, self.recipe.image_variants_name)
+
+    def derivative_exists(self, name):
+        return self.recipe.image.storage.exists(
+            get_derivative_name(name, 'thumbnail', 'webp'))
+
+    def test_original_until_generated(self):
+        self.assertEqual(
+            self.get_urls()['thumbnail']['webp'], self.recipe.image.url)
+        generate_image_derivatives(self.recipe.pk)
+        self.assertEqual(
+            self.get_urls()['thumbnail']['webp'],
+            self.recipe.image.storage.url(get_derivative_name(
+                self.recipe.image.name, 'thumbnail', 'webp')))
+
+    def test_replaced_image(self):
+        generate_image_derivatives(self.recipe.pk)
+        previous = self.recipe.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.image = get_image_file()
+            self.recipe.save(update_fields=['image'])
+        self.assertFalse(self.derivative_exists(previous))
+        self.assertEqual(
+            self.get_urls()['card']['jpeg'], self.recipe.image.url)
+
+    def test_deleted_recipe(self):
+        generate_image_derivatives(self.recipe.pk)
+        name = self.recipe.image.name
+        self.assertTrue(self.derivative_exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertFalse(self.derivative_exists(name))
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from recipes.models import Ingredient
+
+ROWS = [
+    ('соль', 'г'),
+    ('  соль ', 'г'),
+    ('соль', 'г'),
+    ('сахар', 'г'),
+    ('сахар', 'кг'),
+    ('', 'г'),
+]
+
+
+def write_rows(directory, file_format):
+    path = os.path.join(directory, f'ingredients.{file_format}')
+    rows = [
+        {'name': name, 'measurement_unit': measurement_unit}
+        for name, measurement_unit in ROWS
+    ]
+    with open(path, 'w', encoding='utf-8') as file:
+        if file_format == 'csv':
+            file.write('name,measurement_unit\n')
+            file.writelines(
+                f'"{row["name"]}",{row["measurement_unit"]}\n'
+                for row in rows)
+        elif file_format == 'json':
+            json.dump(rows, file, ensure_ascii=False)
+        else:
+            file.writelines(
+                json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+    return path
+
+
+class LoadIngredientsTests(TestCase):
+    """Загрузка ингредиентов убирает пробелы и дубли, повтор ничего не
+    добавляет"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_formats(self):
+        for file_format in ('csv', 'json', 'jsonl'):
+            with self.subTest(file_format=file_format):
+                Ingredient.objects.all().delete()
+                path = write_rows(self.directory, file_format)
+                call_command('load_ingredients_csv', path, batch_size=2,
+                             stdout=StringIO())
+                self.assertEqual(
+                    sorted(Ingredient.objects.values_list(
+                        'name', 'measurement_unit')),
+                    [('сахар', 'г'), ('сахар', 'кг'), ('соль', 'г')])
+
+    def test_rerun_adds_nothing(self):
+        path = write_rows(self.directory, 'jsonl')
+        call_command('load_ingredients_csv', path,
+                     stdout=StringIO())
+        pks = sorted(Ingredient.objects.values_list('pk', flat=True))
+        call_command('load_ingredients_csv', path,
+                     stdout=StringIO())
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('pk', flat=True)), pks)
+
+
+class MergeDuplicateIngredientsTests(TransactionTestCase):
+    """Миграция уникальности сливает дубли ингредиентов вместе с их
+    количествами"""
+
+    before = [('recipes', '0008_counters')]
+    after = [('recipes', '0009_unique_ingredient')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_merge(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('users', 'FoodgramUser')
+        Ingredient = apps.get_model('recipes', 'Ingredient')
+        Recipe = apps.get_model('recipes', 'Recipe')
+        RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+        ShoppingCartTotal = apps.get_model('recipes', 'ShoppingCartTotal')
+        user = User.objects.create(
+            email='user@foodgram.ru', username='user',
+            first_name='Имя', last_name='Фамилия', recipes_count=2)
+        first, second = [
+            Recipe.objects.create(
+                author=user, name=f'Рецепт {number}', text='Описание',
+                cooking_time=1)
+            for number in range(2)
+        ]
+        keep, duplicate = [
+            Ingredient.objects.create(name='соль', measurement_unit='г')
+            for _ in range(2)
+        ]
+        RecipeIngredient.objects.create(
+            recipe=first, ingredient=keep, amount=1)
+        RecipeIngredient.objects.create(
+            recipe=first, ingredient=duplicate, amount=2)
+        RecipeIngredient.objects.create(
+            recipe=second, ingredient=duplicate, amount=4)
+        ShoppingCartTotal.objects.create(
+            user=user, ingredient=duplicate, amount=8)
+
+        apps = self.migrate(self.after)
+        RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+        ShoppingCartTotal = apps.get_model('recipes', 'ShoppingCartTotal')
+        self.assertEqual(
+            list(apps.get_model('recipes', 'Ingredient').objects.values_list(
+                'pk', flat=True)),
+            [keep.pk])
+        self.assertEqual(
+            sorted(RecipeIngredient.objects.values_list(
+                'recipe', 'ingredient', 'amount')),
+            [(first.pk, keep.pk, 3), (second.pk, keep.pk, 4)])
+        self.assertEqual(
+            list(ShoppingCartTotal.objects.values_list(
+                'user', 'ingredient', 'amount')),
+            [(user.pk, keep.pk, 8)])
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from foodgram.testing import create_user
+from recipes.counters import reconcile_counters
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.search import rebuild_search_index
+
+
+class SearchTests(APITestCase):
+    """Поиск находит рецепты по названию, ингредиентам и описанию, а
+    совпадения в названии выше"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.beet = Ingredient.objects.create(
+            name='свекла', measurement_unit='г')
+        cls.borscht, cls.salad, cls.soup = [
+            Recipe.objects.create(
+                author=author, name=name, text=text, cooking_time=1)
+            for name, text in (
+                ('Борщ', 'Первое блюдо'),
+                ('Винегрет', 'Почти как борщ, только холодный'),
+                ('Суп', 'Томатный'),
+            )
+        ]
+        RecipeIngredient.objects.create(
+            recipe=cls.salad, ingredient=cls.beet, amount=1)
+        reconcile_counters()
+        rebuild_search_index(
+            Recipe.objects.values_list('pk', flat=True))
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, value):
+        response = self.client.get('/api/recipes/', {'search': value})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_fields_and_prefix(self):
+        self.assertEqual(self.search('свекл'), [self.salad.pk])
+        self.assertEqual(self.search('томат'), [self.soup.pk])
+        self.assertEqual(self.search('ВИНЕГ'), [self.salad.pk])
+        self.assertEqual(self.search('борщ холодный'), [self.salad.pk])
+        self.assertEqual(self.search('рыба'), [])
+
+    def test_name_ranks_above_text(self):
+        self.assertEqual(
+            self.search('борщ'), [self.borscht.pk, self.salad.pk])
+
+    def test_index_follows_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup.name = 'Гаспачо'
+            self.soup.save(update_fields=['name'])
+        self.assertEqual(self.search('гаспачо'), [self.soup.pk])
+        self.assertEqual(self.search('суп'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=self.soup, ingredient=self.beet, amount=1)
+        self.assertEqual(
+            sorted(self.search('свекла')), [self.salad.pk, self.soup.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_authenticate(self.salad.author)
+            self.client.delete(f'/api/recipes/{self.salad.pk}/')
+        self.assertEqual(self.search('свекла'), [self.soup.pk])
@@ -0,0 +1,61 @@
+import random
+from foodgram.testing import create_user
+from itertools import combinations
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.models import Recipe, Tag
+from recipes.tag_masks import filter_by_tags
+
+TAG_IDS = (1, 2, 3, 5, 8, 63, 64, 100)
+
+
+class TagMaskTests(TestCase):
+    """Фильтр по маске находит те же рецепты, что и JOIN по тегам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        tags = [
+            Tag.objects.create(pk=pk, name=f'Тег {pk}', color=f'#{pk:06d}',
+                               slug=f'tag{pk}')
+            for pk in TAG_IDS
+        ]
+        rng = random.Random(1)
+        for number in range(40):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                cooking_time=1)
+            recipe.tags.set(rng.sample(tags, rng.randint(0, 3)))
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameRecipes(self, tag_ids):
+        expected = set(Recipe.objects.filter(
+            tags__in=tag_ids).values_list('pk', flat=True))
+        self.assertEqual(
+            set(filter_by_tags(Recipe.objects.all(), list(tag_ids))
+                .values_list('pk', flat=True)),
+            expected, tag_ids)
+
+    def check_tag_sets(self):
+        for size in (1, 2, 3):
+            for tag_ids in combinations(TAG_IDS, size):
+                self.assertSameRecipes(tag_ids)
+
+    def test_enumerated_masks(self):
+        self.check_tag_sets()
+
+    @override_settings(TAGS_MASK_ENUMERATION_LIMIT=2)
+    def test_bitand_fallback(self):
+        self.check_tag_sets()
+
+    def test_tag_removed(self):
+        Tag.objects.filter(pk=2).delete()
+        self.assertSameRecipes((1, 2, 3))
+        for recipe in Recipe.objects.filter(tags=1)[:3]:
+            recipe.tags.remove(1)
+        Tag.objects.get(pk=3).recipe_set.clear()
+        self.assertSameRecipes((1, 3))
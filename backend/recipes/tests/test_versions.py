@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from foodgram.checks import check_shared_cache
+from recipes.models import Ingredient
+from recipes.versions import (
+    bump_version, get_recipe_cache_keys, get_version, invalidate_recipes
+    )
+
+
+class VersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_after_commit(self):
+        version = get_version('ingredients')
+        with self.captureOnCommitCallbacks() as callbacks:
+            Ingredient.objects.create(name='соль', measurement_unit='г')
+            self.assertEqual(get_version('ingredients'), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version('ingredients'), version)
+
+    def test_rolled_back_write_keeps_version(self):
+        version = get_version('tags')
+        with self.captureOnCommitCallbacks() as callbacks:
+            bump_version('tags')
+        callbacks.clear()
+        self.assertEqual(get_version('tags'), version)
+
+    def test_recipe_keys_change_after_commit(self):
+        keys = get_recipe_cache_keys([1, 2])
+        self.assertEqual(get_recipe_cache_keys([1, 2]), keys)
+        with self.captureOnCommitCallbacks() as callbacks:
+            invalidate_recipes([1])
+        self.assertEqual(get_recipe_cache_keys([1, 2]), keys)
+        for callback in callbacks:
+            callback()
+        fresh = get_recipe_cache_keys([1, 2])
+        self.assertNotEqual(fresh[1], keys[1])
+        self.assertEqual(fresh[2], keys[2])
+
+    def test_lost_recipe_version_restarts(self):
+        key = get_recipe_cache_keys([1])[1]
+        cache.delete('recipe_version:1')
+        self.assertNotEqual(get_recipe_cache_keys([1])[1], key)
+
+
+class SharedCacheCheckTests(TestCase):
+
+    @override_settings(JOBS_ENABLED=True)
+    def test_jobs_need_shared_cache(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)],
+            ['foodgram.E001'])
+
+    @override_settings(JOBS_ENABLED=True, CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': '127.0.0.1:11211',
+    }})
+    def test_shared_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
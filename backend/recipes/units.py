@@ -0,0 +1,16 @@
+from django.db.models import OuterRef, Subquery
+
+from .models import Ingredient, UnitConversion
+
+
+def get_unit_conversion(measurement_unit):
+    return UnitConversion.objects.filter(unit=measurement_unit).first()
+
+
+def link_unit_conversions(queryset=None):
+    """Связывает ингредиенты с переводом их единицы одним UPDATE"""
+    if queryset is None:
+        queryset = Ingredient.objects.all()
+    queryset.update(unit_conversion=Subquery(
+        UnitConversion.objects.filter(
+            unit=OuterRef('measurement_unit')).values('pk')[:1]))
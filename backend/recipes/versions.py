@@ -0,0 +1,87 @@
+import random
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+RECIPE_KEY = 'recipe:{}:{}:{}'
+RECIPE_VERSION_KEY = 'recipe_version:{}'
+RECIPE_VERSION_START = 2 ** 31
+
+
+def get_version(name):
+    """Текущая версия данных таблицы name"""
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(name):
+    """Помечает данные таблицы name как изменившиеся после коммита.
+
+    Пока транзакция не закрыта, читатели видят старые строки, и новая
+    версия не должна достаться построенным по ним индексам и кэшам.
+    """
+    transaction.on_commit(lambda: cache.set(
+        VERSION_KEY.format(name), uuid.uuid4().hex, timeout=None))
+
+
+def get_counters(keys):
+    """Счетчики версий по ключам кэша {ключ: версия}.
+
+    Пропавший из кэша счетчик начинается со случайного значения, чтобы не
+    совпасть с ключами уже закэшированных данных.
+    """
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, random.randrange(RECIPE_VERSION_START),
+                      timeout=None)
+        versions.update(cache.get_many(missing))
+    return {key: versions.get(key, 0) for key in keys}
+
+
+def increment_counters(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Счетчика нет: следующее чтение начнет его заново
+            pass
+
+
+def get_recipe_versions(pks):
+    """Счетчики версий рецептов {pk: версия}"""
+    keys = {pk: RECIPE_VERSION_KEY.format(pk) for pk in pks}
+    versions = get_counters(list(keys.values()))
+    return {pk: versions[key] for pk, key in keys.items()}
+
+
+def get_recipe_cache_keys(pks):
+    """Ключи кэша представлений рецептов с учетом общей версии и версии
+    каждого рецепта"""
+    generation = get_version('recipes')
+    return {
+        pk: RECIPE_KEY.format(generation, pk, version)
+        for pk, version in get_recipe_versions(pks).items()
+    }
+
+
+def increment_recipe_versions(pks):
+    increment_counters([RECIPE_VERSION_KEY.format(pk) for pk in pks])
+
+
+def invalidate_recipes(pks):
+    """Увеличивает версии рецептов после коммита транзакции.
+
+    Старые представления не удаляются, а перестают читаться и вытесняются
+    из кэша по времени.
+    """
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: increment_recipe_versions(pks))
@@ -30,6 +30,17 @@ class FoodgramUser(AbstractUser):
         verbose_name='Пароль',
         max_length=settings.LENGTH_150,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        db_index=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Пользователь'